@@ -130,6 +130,31 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Dictionary search cache (softools.dictionary.SearchCache).
+# Without an ALIAS every worker process keeps its own results and its own
+# invalidation generation: a Word saved in one process is only seen by the
+# others once their local entries expire, after LOCAL_TTL seconds. Name a cache
+# shared by all processes (Redis, Memcached, database) to make invalidation
+# immediate everywhere.
+#
+# The in-memory suggestion and autocomplete indexes compare themselves with the
+# dictionary validator (latest Word change, word count) at most every
+# INDEX_RECHECK seconds and rebuild when another process has changed words.
+DICTIONARY_CACHE = {
+    'ALIAS': None,
+    'MAXSIZE': 1024,
+    'LOCAL_TTL': 30,
+    'INDEX_RECHECK': 5,
+}
+
+# Home page service catalogue (softools.catalogue.ServiceCatalogue).
+# Without an ALIAS each worker keeps its own copy and only sees Service changes
+# made in that process, and `manage.py warm_catalogue` refuses to run. Name a
+# cache shared by all processes to warm and invalidate every worker at once.
+SERVICE_CATALOGUE = {
+    'ALIAS': None,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
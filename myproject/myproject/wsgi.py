@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 application = get_wsgi_application()
+
+# Build the dictionary's word indexes now rather than inside the first search, then
+# close the connection: pre-fork servers (gunicorn --preload) would otherwise hand
+# the same database socket to every worker.
+from django.db import connections  # noqa: E402
+from softools.fuzzy import warm  # noqa: E402
+
+warm()
+connections.close_all()
@@ -0,0 +1,248 @@
+import os
+import struct
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from scripts import qrcode_generator
+
+OUTPUT_TYPES = ('zip', 'pdf')
+
+
+def encode_payload(item):
+    """Turn a batch item into the string that goes into the QR code.
+
+    Items are either plain strings or {"type": ..., "data": ..., "name": ...}
+    where type is a key of data_encode.
+    """
+    if isinstance(item, str):
+        return item
+    return qrcode_generator.data_encode.encode(item.get('type', 'text'), item['data'])
+
+
+def _item_name(index, item, image_format):
+    name = item.get('name') if isinstance(item, dict) else None
+    name = os.path.basename(str(name)) if name else f'qrcode_{index + 1:05d}'
+    return f'{name}.{qrcode_generator.FILE_EXTENSIONS.get(image_format, image_format)}'
+
+
+def _render_item(job):
+    index, item, options = job
+    try:
+        image = qrcode_generator.render_qr_code(encode_payload(item), **options)
+        return index, _item_name(index, item, options.get('image_format', 'png')), image, None
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        return index, _item_name(index, item, 'txt'), None, f'{type(e).__name__}: {e}'
+
+
+def _render_chunk(jobs):
+    return [_render_item(job) for job in jobs]
+
+
+class BatchPool:
+    """Renderer processes shared by every batch, started on first use.
+
+    Starting a process pool costs far more than rendering a small batch, so
+    one pool is kept per web or command process, like the scan pool. A batch
+    whose consumer goes away (a client disconnecting mid-download) cancels
+    its queued chunks instead of waiting for them.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def configure(self, workers=None):
+        with self._lock:
+            self.workers = workers or os.cpu_count() or 1
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def render(self, jobs, chunksize=None):
+        """Yield _render_item results for jobs in input order."""
+        chunksize = chunksize or max(1, min(64, len(jobs) // (self.workers * 4)))
+        executor = self._pool()
+        futures = []
+        try:
+            for start in range(0, len(jobs), chunksize):
+                futures.append(executor.submit(_render_chunk, jobs[start:start + chunksize]))
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            # A renderer died (killed for memory, say); the next batch gets a fresh pool.
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+batch_pool = BatchPool()
+
+
+def render_batch(items, options, pool=batch_pool, chunksize=None):
+    """Render items across pool, yielding (name, bytes, error) in input order.
+
+    Items are rendered inline when pool is None or has a single worker.
+    """
+    jobs = [(i, item, options) for i, item in enumerate(items)]
+    if pool is None or pool.workers == 1 or len(jobs) < 2:
+        results = map(_render_item, jobs)
+    else:
+        results = pool.render(jobs, chunksize)
+    for _, name, image, error in results:
+        yield name, image, error
+
+
+class _Sink:
+    """Write-only buffer that hands out what has been written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_stream(results):
+    """Stream a ZIP archive of rendered codes; failures are listed in errors.txt."""
+    sink = _Sink()
+    errors = []
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for name, image, error in results:
+            if error:
+                errors.append(f'{name}: {error}')
+                continue
+            compression = zipfile.ZIP_DEFLATED if name.endswith('.svg') else zipfile.ZIP_STORED
+            archive.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), image, compress_type=compression)
+            yield sink.drain()
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield sink.drain()
+
+
+def _png_image_object(png):
+    """Re-use a PNG's IDAT stream as a PDF image (FlateDecode + PNG predictors)."""
+    if png[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError("PDF output needs PNG images")
+    pos, idat, palette = 8, [], None
+    while pos < len(png):
+        length, kind = struct.unpack('>I4s', png[pos:pos + 8])
+        body = png[pos + 8:pos + 8 + length]
+        if kind == b'IHDR':
+            width, height, depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', body)
+        elif kind == b'PLTE':
+            palette = body
+        elif kind == b'IDAT':
+            idat.append(body)
+        pos += 12 + length
+
+    colors = {0: 1, 2: 3, 3: 1}.get(color_type)
+    if colors is None or interlace:
+        # Alpha or interlaced PNGs cannot be passed through; re-encode as plain RGB.
+        from PIL import Image
+        buffered = BytesIO()
+        Image.open(BytesIO(png)).convert('RGB').save(buffered, format='PNG')
+        return _png_image_object(buffered.getvalue())
+
+    if color_type == 3:
+        colorspace = f'[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]'
+    else:
+        colorspace = '/DeviceGray' if color_type == 0 else '/DeviceRGB'
+    header = (
+        f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+        f'/ColorSpace {colorspace} /BitsPerComponent {depth} /Filter /FlateDecode '
+        f'/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {depth} /Columns {width} >> '
+    )
+    return width, height, header, b''.join(idat)
+
+
+def pdf_stream(results):
+    """Stream a PDF with one page per code without holding earlier pages in memory.
+
+    Object 1 is the catalog and object 2 the page tree; both are written last,
+    once every page number is known.
+    """
+    offsets = {}
+    position = 0
+    next_id = 3
+    pages = []
+    errors = []
+
+    def obj(number, body, stream=None):
+        nonlocal position
+        offsets[number] = position
+        chunk = f'{number} 0 obj\n'.encode() + body
+        if stream is not None:
+            chunk += f'/Length {len(stream)} >>\nstream\n'.encode() + stream + b'\nendstream'
+        chunk += b'\nendobj\n'
+        position += len(chunk)
+        return chunk
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+
+    for name, image, error in results:
+        if error:
+            errors.append(f'{name}: {error}')
+            continue
+        width, height, image_header, data = _png_image_object(image)
+        image_id, content_id, page_id = next_id, next_id + 1, next_id + 2
+        next_id += 3
+        content = f'q {width} 0 0 {height} 0 0 cm /Im0 Do Q'.encode()
+        yield (
+            obj(image_id, image_header.encode(), data)
+            + obj(content_id, b'<< ', content)
+            + obj(page_id, (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] '
+                f'/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>'
+            ).encode())
+        )
+        pages.append(page_id)
+
+    if errors:
+        info = '\n'.join(errors).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        info_id = next_id
+        next_id += 1
+        yield obj(info_id, f'<< /Subject ({info}) >>'.encode())
+    kids = ' '.join(f'{page} 0 R' for page in pages)
+    tail = obj(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode())
+    tail += obj(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    xref = [f'xref\n0 {next_id}\n0000000000 65535 f \n']
+    xref += [f'{offsets.get(n, 0):010d} 00000 n \n' for n in range(1, next_id)]
+    trailer = f'trailer\n<< /Size {next_id} /Root 1 0 R'
+    trailer += f' /Info {info_id} 0 R' if errors else ''
+    trailer += f' >>\nstartxref\n{position}\n%%EOF\n'
+    yield tail + ''.join(xref).encode() + trailer.encode()
+
+
+def batch_stream(items, options, output='zip', pool=batch_pool):
+    if output not in OUTPUT_TYPES:
+        raise ValueError(f"Unsupported output: {output!r}")
+    if output == 'pdf' and options.get('image_format', 'png') not in ('png', 'png1'):
+        raise ValueError("PDF output requires PNG images")
+    results = render_batch(items, options, pool)
+    return zip_stream(results) if output == 'zip' else pdf_stream(results)
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class RenderCache:
+    """Content-addressed cache for rendered QR images.
+
+    Keys are hashes of everything that affects the output, so an entry never
+    goes stale. A bounded in-memory LRU sits in front of an optional on-disk
+    tier that evicts the least recently used files once it exceeds max_bytes.
+    Every process sharing the directory tracks its own writes, so the
+    directory is rescanned every rescan_every writes to keep the bound for
+    all of them together.
+    """
+
+    def __init__(self, maxsize=256, directory=None, max_bytes=64 * 1024 * 1024, rescan_every=64):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.rescan_every = rescan_every
+        self._writes = 0
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk = None
+        self._disk_bytes = 0
+        self._render_times = {}
+        self._stats = dict.fromkeys(('memory_hits', 'disk_hits', 'misses', 'errors'), 0)
+        self._stats.update(render_seconds=0.0, saved_seconds=0.0)
+
+    def configure(self, maxsize=None, directory=None, max_bytes=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if directory is not None:
+                self.directory = Path(directory)
+                self._disk = None
+
+    def get_or_render(self, key, render):
+        data = self._get(key)
+        if data is not None:
+            return data
+        start = time.perf_counter()
+        data = render()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['render_seconds'] += elapsed
+            self._render_times[key] = elapsed
+        self._put_memory(key, data)
+        self._put_disk(key, data)
+        return data
+
+    def _saved(self, key):
+        # Entries loaded from disk by another process have no timing; use the average.
+        average = self._stats['render_seconds'] / self._stats['misses'] if self._stats['misses'] else 0.0
+        self._stats['saved_seconds'] += self._render_times.get(key, average)
+
+    def _get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                self._saved(key)
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self._stats['disk_hits'] += 1
+                self._saved(key)
+            self._put_memory(key, data)
+        return data
+
+    def _put_memory(self, key, data):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                evicted, _ = self._memory.popitem(last=False)
+                self._render_times.pop(evicted, None)
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def _load_disk_index(self):
+        # Called with the lock held; scans the directory once per process.
+        if self._disk is not None:
+            return
+        entries = []
+        if self.directory.exists():
+            for path in self.directory.glob('*/*'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path.name, stat.st_size))
+        entries.sort()
+        self._disk = OrderedDict((name, size) for _, name, size in entries)
+        self._disk_bytes = sum(self._disk.values())
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            if self._disk is not None and key in self._disk:
+                self._disk.move_to_end(key)
+        return data
+
+    def _put_disk(self, key, data):
+        if self.directory is None or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            with self._lock:
+                self._stats['errors'] += 1
+            return
+        with self._lock:
+            self._writes += 1
+            if self._writes % self.rescan_every == 0:
+                self._disk = None
+            self._load_disk_index()
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            while self._disk_bytes > self.max_bytes and self._disk:
+                evicted, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    self._path(evicted).unlink()
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._render_times.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, memory_entries=len(self._memory))
+            if self._disk is not None:
+                stats.update(disk_entries=len(self._disk), disk_bytes=self._disk_bytes)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+
+
+render_cache = RenderCache()
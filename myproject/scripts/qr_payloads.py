@@ -0,0 +1,336 @@
+import json
+import math
+import re
+from functools import lru_cache
+from collections.abc import Mapping, Sequence
+from typing import NamedTuple
+from urllib.parse import quote
+
+URL_SCHEME = re.compile(r'^https?://', re.IGNORECASE)
+MAILTO_SCHEME = re.compile(r'^mailto:', re.IGNORECASE)
+TEL_SCHEME = re.compile(r'^tel:', re.IGNORECASE)
+PHONE_NUMBER = re.compile(r'^\+?[0-9][0-9 ()./-]{2,30}$')
+EMAIL_ADDRESS = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+PROPERTY_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9-]*(;[A-Za-z0-9=-]+)*$')
+ICAL_DATE = re.compile(r'^\d{8}(T\d{6}Z?)?$')
+ETHEREUM_ADDRESS = re.compile(r'^0x[0-9a-fA-F]{40}$')
+BITCOIN_ADDRESS = re.compile(r'^[A-Za-z0-9]{20,90}$')
+PACKAGE_NAME = re.compile(r'^[A-Za-z][\w]*(\.[A-Za-z][\w]*)+$')
+APP_ID = re.compile(r'^(?:id)?(\d{1,12})$')
+# MECARD, MEBKM, MATMSG and WIFI all use backslash escapes for their delimiters.
+ME_SPECIAL = ('\\', ';', ':', ',', '"')
+WIFI_TYPES = {'WPA': 'WPA', 'WPA2': 'WPA', 'WPA3': 'WPA', 'SAE': 'SAE', 'WEP': 'WEP', 'NOPASS': 'nopass'}
+
+
+def me_escape(value):
+    # Chained str.replace beats both re.sub and str.translate on short field values.
+    for char in ME_SPECIAL:
+        if char in value:
+            value = value.replace(char, '\\' + char)
+    return value
+
+
+def _one_line(value):
+    return value.replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+
+
+class PayloadEncoder(NamedTuple):
+    name: str
+    encode: object
+    example: object
+    structured: bool
+
+
+class EncoderRegistry(Mapping):
+    """Named payload encoders: registry[kind](data) returns the string to put in the QR code.
+
+    Encoders validate their input and raise ValueError with a message naming
+    the payload type, so callers can report bad input without a traceback.
+    """
+
+    def __init__(self):
+        self._encoders = {}
+
+    def register(self, name, example, structured=True):
+        def decorator(func):
+            self._encoders[name] = PayloadEncoder(name, func, example, structured)
+            return func
+        return decorator
+
+    def __getitem__(self, name):
+        return self._encoders[name].encode
+
+    def __iter__(self):
+        return iter(self._encoders)
+
+    def __len__(self):
+        return len(self._encoders)
+
+    def encoder(self, kind):
+        try:
+            return self._encoders[kind]
+        except KeyError:
+            raise ValueError(f"Unknown payload type: {kind!r}") from None
+
+    def encode(self, kind, data):
+        return self.encoder(kind).encode(data)
+
+    def parse(self, kind, raw):
+        """Turn form input into encoder input; structured types take JSON."""
+        if not self.encoder(kind).structured:
+            return raw
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"{kind} expects JSON like {json.dumps(self._encoders[kind].example)}") from None
+
+
+data_encode = EncoderRegistry()
+
+
+def _text(kind, value, field='value', pattern=None, required=True):
+    if not isinstance(value, str):
+        if value is None:
+            value = ''
+        elif not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise ValueError(f"{kind}: {field} must be text")
+        value = str(value)
+    # Returned as given: surrounding spaces can be part of a password or message.
+    if required and not value.strip():
+        raise ValueError(f"{kind}: {field} is required")
+    if value and pattern is not None and not pattern.match(value):
+        raise ValueError(f"{kind}: invalid {field} {value!r}")
+    return value
+
+
+def _fields(kind, data, names):
+    """Accept (a, b, ...) or {'a': ..., 'b': ...} and return the values in order."""
+    if isinstance(data, Mapping):
+        return [data.get(name) for name in names]
+    if isinstance(data, Sequence) and not isinstance(data, str) and len(data) == len(names):
+        return data
+    raise ValueError(f"{kind} expects ({', '.join(names)})")
+
+
+def _mapping(kind, data):
+    if not isinstance(data, Mapping):
+        raise ValueError(f"{kind} expects an object with named fields")
+    return data
+
+
+@lru_cache(maxsize=256)
+def _property_name(kind, name):
+    return _text(kind, name, 'field name', PROPERTY_NAME).upper()
+
+
+def _pairs(kind, data):
+    if isinstance(data, Mapping):
+        data = list(data.items())
+    if not isinstance(data, (list, tuple)) or not data:
+        raise ValueError(f"{kind} expects a list of (field, value) pairs")
+    pairs = []
+    for item in data:
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            raise ValueError(f"{kind} expects a list of (field, value) pairs")
+        name, value = item
+        if not isinstance(name, str):
+            raise ValueError(f"{kind}: field names must be text")
+        pairs.append((_property_name(kind, name), _text(kind, value, name)))
+    return pairs
+
+
+def _coordinates(kind, data):
+    latitude, longitude = _fields(kind, data, ('latitude', 'longitude'))
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError(f"{kind}: latitude and longitude must be numbers") from None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or math.isnan(latitude + longitude):
+        raise ValueError(f"{kind}: coordinates out of range")
+    return f'{latitude:g}', f'{longitude:g}'
+
+
+# Basic text and URL
+
+@data_encode.register('text', 'Hello from SofTools', structured=False)
+def encode_text(data):
+    return _text('text', data, 'text')
+
+
+@data_encode.register('url', 'https://example.com', structured=False)
+def encode_url(data):
+    return URL_SCHEME.sub('', _text('url', data, 'URL'))
+
+
+# Email related
+
+@data_encode.register('email', 'john@example.com', structured=False)
+def encode_email(data):
+    return 'mailto:' + _text('email', MAILTO_SCHEME.sub('', _text('email', data, 'address')), 'address', EMAIL_ADDRESS)
+
+
+@data_encode.register('emailmessage', ['john@example.com', 'Team meeting', 'Weekly sync moved to 3pm'])
+def encode_email_message(data):
+    to, subject, body = _fields('emailmessage', data, ('to', 'subject', 'body'))
+    to = _text('emailmessage', to, 'to', EMAIL_ADDRESS)
+    subject = _text('emailmessage', subject, 'subject', required=False)
+    body = _text('emailmessage', body, 'body', required=False)
+    return f'MATMSG:TO:{me_escape(to)};SUB:{me_escape(subject)};BODY:{me_escape(body)};;'
+
+
+# Phone and messaging
+
+@data_encode.register('telephone', '+1234567890', structured=False)
+def encode_telephone(data):
+    return 'tel:' + _text('telephone', TEL_SCHEME.sub('', _text('telephone', data, 'number')), 'number', PHONE_NUMBER)
+
+
+def _message(kind, prefix, data):
+    number, message = _fields(kind, data, ('number', 'message'))
+    return f"{prefix}:{_text(kind, number, 'number', PHONE_NUMBER)}:{_text(kind, message, 'message', required=False)}"
+
+
+@data_encode.register('sms', ['+1234567890', 'Running late, be there in 10'])
+def encode_sms(data):
+    return _message('sms', 'SMSTO', data)
+
+
+@data_encode.register('mms', ['+1234567890', 'Photos from the trip'])
+def encode_mms(data):
+    return _message('mms', 'MMSTO', data)
+
+
+# Location
+
+@data_encode.register('geo', [40.7128, -74.006])
+def encode_geo(data):
+    latitude, longitude = _coordinates('geo', data)
+    return f'geo:{latitude},{longitude}'
+
+
+@data_encode.register('googlemap', [40.7128, -74.006])
+def encode_google_map(data):
+    latitude, longitude = _coordinates('googlemap', data)
+    return f'https://maps.google.com/local?q={latitude},{longitude}'
+
+
+# Bookmarks and contacts
+
+@data_encode.register('bookmark', ['SofTools', 'https://softools.example.com'])
+def encode_bookmark(data):
+    title, url = _fields('bookmark', data, ('title', 'url'))
+    title, url = _text('bookmark', title, 'title', required=False), _text('bookmark', url, 'url')
+    return f'MEBKM:TITLE:{me_escape(title)};URL:{me_escape(url)};;'
+
+
+@data_encode.register('phonebook', [['N', 'Doe,John'], ['TEL', '+1234567890'], ['EMAIL', 'john@example.com']])
+def encode_phonebook(data):
+    fields = ''.join(f'{name}:{me_escape(value)};' for name, value in _pairs('phonebook', data))
+    return f'MECARD:{fields};'
+
+
+@data_encode.register('vcard', [
+    ['FN', 'John Doe'], ['TEL', '+1234567890'], ['EMAIL', 'john@example.com'],
+    ['ORG', 'Company Name'], ['TITLE', 'Software Engineer'],
+])
+def encode_vcard(data):
+    lines = [f'{name}:{_one_line(value)}' for name, value in _pairs('vcard', data)]
+    return '\n'.join(['BEGIN:VCARD', 'VERSION:3.0', *lines, 'END:VCARD'])
+
+
+# Wi-Fi configuration
+
+@data_encode.register('wifi', {'type': 'WPA', 'ssid': 'MyNetwork', 'password': 'MyPassword'})
+def encode_wifi(data):
+    data = _mapping('wifi', data)
+    auth = WIFI_TYPES.get(_text('wifi', data.get('type', 'WPA'), 'type').upper())
+    if auth is None:
+        raise ValueError(f"wifi: type must be one of {', '.join(sorted(WIFI_TYPES))}")
+    ssid = _text('wifi', data.get('ssid'), 'ssid')
+    password = _text('wifi', data.get('password'), 'password', required=auth != 'nopass')
+    hidden = 'H:true;' if data.get('hidden') else ''
+    return f'WIFI:T:{auth};S:{me_escape(ssid)};P:{me_escape(password)};{hidden};'
+
+
+# Calendar events
+
+@data_encode.register('calendar', {
+    'summary': 'Team Meeting', 'start': '20240224T140000Z', 'end': '20240224T150000Z',
+    'location': 'Conference Room', 'description': 'Weekly team sync',
+})
+def encode_calendar(data):
+    data = _mapping('calendar', data)
+    start = _text('calendar', data.get('start'), 'start', ICAL_DATE)
+    end = _text('calendar', data.get('end'), 'end', ICAL_DATE)
+    if len(start) == len(end) and end < start:
+        raise ValueError("calendar: end is before start")
+    return '\n'.join([
+        'BEGIN:VEVENT',
+        f"SUMMARY:{_one_line(_text('calendar', data.get('summary'), 'summary'))}",
+        f'DTSTART:{start}',
+        f'DTEND:{end}',
+        f"LOCATION:{_one_line(_text('calendar', data.get('location'), 'location', required=False))}",
+        f"DESCRIPTION:{_one_line(_text('calendar', data.get('description'), 'description', required=False))}",
+        'END:VEVENT',
+    ])
+
+
+# Cryptocurrency payments
+
+def _query(kind, data, names):
+    query = []
+    for name in names:
+        value = _text(kind, data.get(name), name, required=False)
+        if value:
+            query.append(f"{name}={quote(value, safe='')}")
+    return f"?{'&'.join(query)}" if query else ''
+
+
+@data_encode.register('bitcoin', {'address': '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa', 'amount': '0.001', 'label': 'Payment'})
+def encode_bitcoin(data):
+    data = _mapping('bitcoin', data)
+    address = _text('bitcoin', data.get('address'), 'address', BITCOIN_ADDRESS)
+    return f"bitcoin:{address}{_query('bitcoin', data, ('amount', 'label'))}"
+
+
+@data_encode.register('ethereum', {'address': '0xde0B295669a9FD93d5F28D9Ec85E40f4cb697BAe', 'value': '1e16'})
+def encode_ethereum(data):
+    data = _mapping('ethereum', data)
+    address = _text('ethereum', data.get('address'), 'address', ETHEREUM_ADDRESS)
+    return f"ethereum:{address}{_query('ethereum', data, ('value',))}"
+
+
+# Social media profiles
+
+def _profile(kind, base, data):
+    return base + quote(_text(kind, data, 'handle').lstrip('@'), safe='')
+
+
+@data_encode.register('twitter', 'softools', structured=False)
+def encode_twitter(data):
+    return _profile('twitter', 'https://twitter.com/', data)
+
+
+@data_encode.register('linkedin', 'john-doe', structured=False)
+def encode_linkedin(data):
+    return _profile('linkedin', 'https://linkedin.com/in/', data)
+
+
+@data_encode.register('github', 'softools', structured=False)
+def encode_github(data):
+    return _profile('github', 'https://github.com/', data)
+
+
+# App store links
+
+@data_encode.register('playstore', 'com.example.softools', structured=False)
+def encode_playstore(data):
+    return f"market://details?id={_text('playstore', data, 'package name', PACKAGE_NAME)}"
+
+
+@data_encode.register('appstore', '1234567890', structured=False)
+def encode_appstore(data):
+    app_id = APP_ID.match(_text('appstore', data, 'app id'))
+    if not app_id:
+        raise ValueError(f"appstore: invalid app id {data!r}")
+    return f'https://apps.apple.com/app/id{app_id.group(1)}'
@@ -0,0 +1,76 @@
+from collections import namedtuple
+from functools import lru_cache
+
+QRPlan = namedtuple('QRPlan', 'version error_correction mode')
+
+# Weakest to strongest; the planner only ever moves up this list.
+LEVELS = ('L', 'M', 'Q', 'H')
+# The QR spec's format bits and mode indicators, equal to qrcode.constants and
+# qrcode.util's. Importing qrcode also imports PIL, so it waits until a payload
+# is actually planned.
+LEVEL_CONSTANTS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+MODE_NUMBER, MODE_ALPHA_NUM, MODE_8BIT_BYTE = 1, 2, 4
+MODE_NAMES = {MODE_NUMBER: 'numeric', MODE_ALPHA_NUM: 'alphanumeric', MODE_8BIT_BYTE: 'byte'}
+
+
+def payload_shape(data):
+    """(mode, length) of the single segment the payload will be encoded as."""
+    from qrcode import util
+
+    payload = util.to_bytestring(data)
+    return util.optimal_mode(payload), len(payload)
+
+
+def _data_bits(mode, length):
+    if mode == MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def _needed_bits(mode, length, version):
+    from qrcode import util
+
+    return 4 + util.length_in_bits(mode, version) + _data_bits(mode, length)
+
+
+def _fits(mode, length, version, level):
+    from qrcode import util
+
+    return _needed_bits(mode, length, version) <= util.BIT_LIMIT_TABLE[LEVEL_CONSTANTS[level]][version]
+
+
+@lru_cache(maxsize=4096)
+def plan_for_shape(mode, length, error_correction='L', boost=True):
+    """Smallest version that holds length characters in mode at error_correction.
+
+    With boost, the level is then raised as far as it goes without growing the
+    symbol, so the extra error correction comes for free. Decisions depend only
+    on the shape, so they are memoised across payloads.
+    """
+    if error_correction not in LEVEL_CONSTANTS:
+        raise ValueError(f"Unsupported error correction level: {error_correction!r}")
+    version = next((v for v in range(1, 41) if _fits(mode, length, v, error_correction)), None)
+    if version is None:
+        raise ValueError(f"Payload of {length} {MODE_NAMES[mode]} characters does not fit in a QR code "
+                         f"at error correction {error_correction}")
+    level = error_correction
+    if boost:
+        for stronger in LEVELS[LEVELS.index(error_correction) + 1:]:
+            if not _fits(mode, length, version, stronger):
+                break
+            level = stronger
+    return QRPlan(version, level, MODE_NAMES[mode])
+
+
+def plan_qr(data, error_correction='L', boost=True):
+    return plan_for_shape(*payload_shape(data), error_correction, boost)
+
+
+def segment(data):
+    """The payload as one QRData segment in the mode plan_qr assumed."""
+    from qrcode import util
+
+    mode, _ = payload_shape(data)
+    return util.QRData(data, mode=mode)
@@ -0,0 +1,65 @@
+import struct
+import zlib
+
+import numpy as np
+from PIL import ImageColor
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _chunk(kind, body):
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+
+def _scanlines(module_rows, box_size, row_filter):
+    """Expand one pixel row per module row into box_size PNG scanlines.
+
+    With filter type 2 (Up) only the first scanline of each module row differs
+    from the one above it, so the remaining box_size - 1 lines are left as zeros
+    instead of being repeated and then differenced.
+    """
+    count, width = module_rows.shape
+    scanlines = np.zeros((count, box_size, width + 1), dtype=np.uint8)
+    scanlines[:, :, 0] = row_filter
+    if row_filter == 2:
+        scanlines[:, 0, 1:] = np.diff(module_rows, axis=0, prepend=np.zeros((1, width), dtype=np.uint8))
+    else:
+        scanlines[:, :, 1:] = module_rows[:, None, :]
+    return scanlines.reshape(count * box_size, width + 1)
+
+
+def _png(width, height, bit_depth, color_type, scanlines, palette=None, level=6):
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    body = _chunk(b'IHDR', header)
+    if palette is not None:
+        body += _chunk(b'PLTE', palette)
+    body += _chunk(b'IDAT', zlib.compress(scanlines.tobytes(), level))
+    return PNG_SIGNATURE + body + _chunk(b'IEND', b'')
+
+
+def rgb(color):
+    return ImageColor.getrgb(color)[:3]
+
+
+def module_array(matrix):
+    """qr.get_matrix() (border included) as a boolean array, True for dark modules."""
+    return np.asarray(matrix, dtype=bool)
+
+
+def encode_png(modules, box_size, fill_color='black', back_color='white', palette=False):
+    """Encode a module array as PNG, scaling and colouring it in vectorised steps.
+
+    palette=True writes a 1-bit indexed PNG (two palette entries), which is a
+    fraction of the size of the RGB output for the same image.
+    """
+    fill, back = rgb(fill_color), rgb(back_color)
+    size = modules.shape[0] * box_size
+    # Work on one pixel row per module row; _scanlines does the vertical scaling.
+    wide = np.repeat(modules, box_size, axis=1)
+    if palette:
+        # Packed 1-bit rows already compress best unfiltered.
+        rows = _scanlines(np.packbits(wide, axis=1), box_size, 0)
+        return _png(size, size, 1, 3, rows, palette=bytes(back + fill))
+    colors = np.array([back, fill], dtype=np.uint8)
+    rows = colors[wide.view(np.uint8)].reshape(modules.shape[0], size * 3)
+    return _png(size, size, 8, 2, _scanlines(rows, box_size, 2))
@@ -0,0 +1,257 @@
+import concurrent.futures
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# cv2, numpy, PIL and pyzbar are imported inside the functions that use them:
+# this module is imported at startup (for scan_pool) and they cost far more
+# than the rest of the app to load.
+
+# Longest side of the first, cheap pass; phone photos are reduced to about this.
+DOWNSAMPLE_SIDE = 1600
+TILE_SIZE = 1024
+TILE_OVERLAP = 256
+ROI_MARGIN = 0.25
+PDF_SCALE = 150 / 72
+
+
+def _decode(pixels, offset=(0, 0), scale=1):
+    """pyzbar results as dicts, with polygons mapped back to full-frame coordinates."""
+    from pyzbar.pyzbar import decode
+
+    dx, dy = offset
+    codes = []
+    for obj in decode(pixels):
+        codes.append({
+            'data': obj.data.decode('utf-8', errors='replace'),
+            'type': obj.type,
+            'polygon': [[round(x * scale + dx), round(y * scale + dy)] for x, y in obj.polygon],
+        })
+    return codes
+
+
+def _downsample(gray):
+    factor = math.ceil(max(gray.size) / DOWNSAMPLE_SIDE)
+    return (gray.reduce(factor), factor) if factor > 1 else (gray, 1)
+
+
+def _tiles(width, height):
+    step = TILE_SIZE - TILE_OVERLAP
+    xs = range(0, max(width - TILE_OVERLAP, 1), step)
+    ys = range(0, max(height - TILE_OVERLAP, 1), step)
+    return [(x, y, min(x + TILE_SIZE, width), min(y + TILE_SIZE, height)) for y in ys for x in xs]
+
+
+def _regions(small, scale, width, height):
+    """Boxes around finder-pattern candidates in the reduced image, in full-frame pixels."""
+    import cv2
+
+    found, points = cv2.QRCodeDetector().detectMulti(small)
+    if not found or points is None:
+        return []
+    boxes = []
+    for quad in points:
+        x0, y0 = quad.min(axis=0) * scale
+        x1, y1 = quad.max(axis=0) * scale
+        margin = max(x1 - x0, y1 - y0) * ROI_MARGIN
+        boxes.append((
+            max(int(x0 - margin), 0), max(int(y0 - margin), 0),
+            min(int(x1 + margin) + 1, width), min(int(y1 + margin) + 1, height),
+        ))
+    return boxes
+
+
+def _centre(code):
+    xs, ys = zip(*code['polygon'])
+    return sum(xs) / len(xs), sum(ys) / len(ys), max(max(xs) - min(xs), max(ys) - min(ys))
+
+
+def _merge(codes):
+    """Drop the same code seen again by an overlapping tile or region."""
+    kept = []
+    for code in codes:
+        x, y, size = _centre(code)
+        for other in kept:
+            ox, oy, _ = _centre(other)
+            if other['data'] == code['data'] and math.hypot(x - ox, y - oy) < max(size, 1) / 2:
+                break
+        else:
+            kept.append(code)
+    return kept
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.monotonic() > deadline:
+        raise ValueError("Scanning took too long")
+
+
+def decode_frame(image, executor=None, deadline=None):
+    """Every code in one image, cheapest strategy first.
+
+    1. Decode a copy reduced to about DOWNSAMPLE_SIDE pixels.
+    2. Otherwise decode full-resolution crops around candidate finder
+       patterns located in the reduced copy.
+    3. Otherwise decode overlapping full-resolution tiles.
+
+    Crops and tiles are decoded on the executor; zbar runs outside the GIL.
+    """
+    import numpy as np
+
+    gray = image.convert('L')
+    small, scale = _downsample(gray)
+    small_pixels = np.asarray(small)
+    codes = _decode(small_pixels, scale=scale)
+    if codes:
+        return _merge(codes)
+
+    full = np.asarray(gray)
+    height, width = full.shape
+    strategies = [_regions(small_pixels, scale, width, height)]
+    if width > TILE_SIZE or height > TILE_SIZE:
+        strategies.append(_tiles(width, height))
+    for boxes in strategies:
+        _check_deadline(deadline)
+        jobs = [(full[y0:y1, x0:x1], (x0, y0)) for x0, y0, x1, y1 in boxes]
+        decoded = executor.map(lambda job: _decode(*job), jobs) if executor else (_decode(*job) for job in jobs)
+        codes = _merge([code for found in decoded for code in found])
+        if codes:
+            return codes
+    return []
+
+
+def _check_frames(count, max_frames):
+    if max_frames and count > max_frames:
+        raise ValueError(f"Upload has {count} pages; at most {max_frames} can be scanned")
+
+
+def _limit_frame(image, max_pixels):
+    """Check a frame's size from its header before any pixel data is decoded.
+
+    JPEGs over the limit are asked to decode at 1/2, 1/4 or 1/8 scale instead
+    (always in grayscale), which also cuts the memory the decoder needs.
+    """
+    width, height = image.size
+    if image.format in ('JPEG', 'MPO'):
+        for scale in (1, 2, 4, 8):
+            size = (math.ceil(width / scale), math.ceil(height / scale))
+            if not max_pixels or size[0] * size[1] <= max_pixels:
+                image.draft('L', size)
+                return image
+    elif not max_pixels or width * height <= max_pixels:
+        return image
+    raise ValueError(f"Image is {width}x{height} pixels; the limit is {max_pixels} pixels")
+
+
+def _pdf_pages(file_obj, max_pixels=None, max_frames=None):
+    try:
+        import pypdfium2
+    except ImportError:
+        raise ValueError("Scanning PDF files requires the pypdfium2 package")
+    pdf = pypdfium2.PdfDocument(file_obj)
+    try:
+        _check_frames(len(pdf), max_frames)
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                width, height = page.get_size()
+                scale = PDF_SCALE
+                if max_pixels and width * height * scale ** 2 > max_pixels:
+                    scale = math.sqrt(max_pixels / (width * height))
+                yield page.render(scale=scale, grayscale=True).to_pil()
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+
+
+def iter_frames(file_obj, max_pixels=None, max_frames=None):
+    """Yield the pages of a PDF or the frames of a TIFF/GIF one at a time."""
+    from PIL import Image, ImageSequence
+
+    header = file_obj.read(5)
+    file_obj.seek(0)
+    if header == b'%PDF-':
+        yield from _pdf_pages(file_obj, max_pixels, max_frames)
+        return
+    # Image.open only parses the header; pixels are decoded on first access.
+    image = Image.open(file_obj)
+    _check_frames(getattr(image, 'n_frames', 1), max_frames)
+    # ImageSequence seeks lazily, so only the current frame is decoded in memory.
+    for frame in ImageSequence.Iterator(image):
+        yield _limit_frame(frame, max_pixels)
+
+
+def scan_file(file_obj, workers=None, max_pixels=None, max_frames=None, deadline=None):
+    """All codes in an uploaded image or document, tagged with their frame index.
+
+    deadline is a time.monotonic() value; the scan gives up between passes once
+    it has passed.
+    """
+    from PIL import Image
+
+    codes = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            for index, frame in enumerate(iter_frames(file_obj, max_pixels, max_frames)):
+                _check_deadline(deadline)
+                for code in decode_frame(frame, executor, deadline):
+                    codes.append(dict(code, frame=index))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Could not read image: {e}") from e
+    return codes
+
+
+class ScanPool:
+    """Runs scans off the request thread, with a timeout.
+
+    At most `concurrency` scans decode at once and at most `backlog` more may
+    wait; further requests are refused straight away rather than piling up
+    decoded images in memory. A scan that times out keeps its slot until it
+    notices its deadline and stops.
+    """
+
+    def __init__(self, concurrency=2, backlog=4):
+        self.concurrency = concurrency
+        self.backlog = backlog
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(concurrency + backlog)
+
+    def configure(self, concurrency=None, backlog=None):
+        with self._lock:
+            if concurrency is not None:
+                self.concurrency = concurrency
+            if backlog is not None:
+                self.backlog = backlog
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._slots = threading.BoundedSemaphore(self.concurrency + self.backlog)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='qr-scan')
+            return self._executor, self._slots
+
+    def scan(self, file_obj, timeout=None, **options):
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            raise ValueError("Too many scans in progress; please try again shortly")
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            future = executor.submit(scan_file, file_obj, deadline=deadline, **options)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise ValueError(f"Scanning took longer than {timeout} seconds")
+
+
+scan_pool = ScanPool()
@@ -0,0 +1,152 @@
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+
+import cv2
+from pyzbar.pyzbar import decode
+
+_END = object()
+SAMPLE_WINDOW = 1000
+
+
+class VideoScanStats:
+    """Counters filled in while scan_video runs; read them at any time."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.codes = 0
+        # Recent samples only, so long-running scans use constant memory.
+        self.decode_seconds = deque(maxlen=SAMPLE_WINDOW)
+        self.latency_seconds = deque(maxlen=SAMPLE_WINDOW)
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+
+        def ms(values, pick):
+            return round(pick(values) * 1000, 2) if values else None
+
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'frames_read': self.frames_read,
+            'frames_decoded': self.frames_decoded,
+            'frames_dropped': self.frames_dropped,
+            'codes': self.codes,
+            'capture_fps': round(self.frames_read / elapsed, 1),
+            'decode_fps': round(self.frames_decoded / elapsed, 1),
+            'decode_ms_mean': ms(self.decode_seconds, statistics.fmean),
+            'decode_ms_max': ms(self.decode_seconds, max),
+            # Capture of a frame to the end of its decode, queue wait included.
+            'latency_ms_mean': ms(self.latency_seconds, statistics.fmean),
+            'latency_ms_max': ms(self.latency_seconds, max),
+        }
+
+
+def _prepare(frame, max_side):
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    scale = max(height, width) / max_side if max_side else 1
+    if scale > 1:
+        gray = cv2.resize(gray, (round(width / scale), round(height / scale)), interpolation=cv2.INTER_AREA)
+        return gray, scale
+    return gray, 1
+
+
+def _capture(capture, frames, stop, frame_skip, max_side, drop, stats):
+    """Read frames, keep every (frame_skip + 1)th one, and queue it reduced to grayscale."""
+    index = 0
+    try:
+        while not stop.is_set():
+            ok, frame = capture.read()
+            if not ok:
+                break
+            stats.frames_read += 1
+            index += 1
+            if (index - 1) % (frame_skip + 1):
+                continue
+            item = (index - 1, time.perf_counter(), *_prepare(frame, max_side))
+            if drop:
+                # Live sources: never fall behind; replace the oldest waiting frame.
+                while True:
+                    try:
+                        frames.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            frames.get_nowait()
+                            stats.frames_dropped += 1
+                        except queue.Empty:
+                            pass
+            else:
+                while not stop.is_set():
+                    try:
+                        frames.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+    finally:
+        capture.release()
+        while True:
+            try:
+                frames.put(_END, timeout=0.1)
+                break
+            except queue.Full:
+                if stop.is_set():
+                    break
+
+
+def scan_video(source=0, frame_skip=2, max_side=640, queue_size=4, drop_frames=None, stats=None):
+    """Yield each distinct code seen in a cv2.VideoCapture source, without a display.
+
+    source is anything VideoCapture accepts: a camera index, a video file or a
+    stream URL. A capture thread reads frames, keeps one in every
+    frame_skip + 1, converts it to grayscale no larger than max_side and
+    puts it on a bounded queue. The generator's own thread decodes from that
+    queue. Live sources (camera indexes) drop the oldest queued frame rather
+    than fall behind; files wait, so every kept frame is decoded. Pass a
+    VideoScanStats to watch frame rates and latency.
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source {source!r}")
+    stats = stats if stats is not None else VideoScanStats()
+    drop = isinstance(source, int) if drop_frames is None else drop_frames
+    frames = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_capture, args=(capture, frames, stop, frame_skip, max_side, drop, stats),
+        name='qr-video-capture', daemon=True,
+    )
+    reader.start()
+    seen = set()
+    try:
+        while True:
+            item = frames.get()
+            if item is _END:
+                break
+            index, captured, gray, scale = item
+            start = time.perf_counter()
+            decoded = decode(gray)
+            finished = time.perf_counter()
+            stats.frames_decoded += 1
+            stats.decode_seconds.append(finished - start)
+            stats.latency_seconds.append(finished - captured)
+            for obj in decoded:
+                data = obj.data.decode('utf-8', errors='replace')
+                if data in seen:
+                    continue
+                seen.add(data)
+                stats.codes += 1
+                yield {
+                    'data': data,
+                    'type': obj.type,
+                    'polygon': [[round(x * scale), round(y * scale)] for x, y in obj.polygon],
+                    'frame': index,
+                }
+    finally:
+        stop.set()
+        reader.join()
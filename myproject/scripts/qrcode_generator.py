@@ -1,121 +1,147 @@
-from qrcode import QRCode
-from qrcode.constants import ERROR_CORRECT_L
 import base64
+import hashlib
 from io import BytesIO
-import cv2
-import numpy as np
-from pyzbar.pyzbar import decode
-from PIL import Image
 import re
+from scripts.qr_cache import render_cache
+from scripts import qr_plan, qr_scan
+from scripts.qr_payloads import data_encode
 
-data_encode = {
-    # Basic text and URL
-    'text': lambda data: data,
-    'url': lambda data: re.compile(r'^https?://', re.IGNORECASE).sub('', data),
-    
-    # Email related
-    'email': lambda data: 'mailto:' + re.compile(r'^mailto:', re.IGNORECASE).sub('', data),
-    'emailmessage': lambda data: f'MATMSG:TO:{data[0]};SUB:{data[1]};BODY:{data[2]};;',
-    
-    # Phone and messaging
-    'telephone': lambda data: 'tel:' + re.compile(r'^tel:', re.IGNORECASE).sub('', data),
-    'sms': lambda data: f'SMSTO:{data[0]}:{data[1]}',
-    'mms': lambda data: f'MMSTO:{data[0]}:{data[1]}',
-    
-    # Location
-    'geo': lambda data: f'geo:{data[0]},{data[1]}',
-    'googlemap': lambda data: f'https://maps.google.com/local?q={data[0]},{data[1]}',
-    
-    # Bookmarks and contacts
-    'bookmark': lambda data: f'MEBKM:TITLE:{data[0]};URL:{data[1]};;',
-    'phonebook': lambda data: f"MECARD:{';'.join([':'.join(i) for i in data])};",
-    'vcard': lambda data: f"BEGIN:VCARD\nVERSION:3.0\n{''.join([f'{k}:{v}\n' for k,v in data])}\nEND:VCARD",
-    
-    # Wi-Fi configuration
-    'wifi': lambda data: f"WIFI:T:{data.get('type', 'WPA')};S:{data['ssid']};P:{data.get('password', '')};;",
-    
-    # Calendar events
-    'calendar': lambda data: (
-        f"BEGIN:VEVENT\n"
-        f"SUMMARY:{data['summary']}\n"
-        f"DTSTART:{data['start']}\n"
-        f"DTEND:{data['end']}\n"
-        f"LOCATION:{data.get('location', '')}\n"
-        f"DESCRIPTION:{data.get('description', '')}\n"
-        f"END:VEVENT"
-    ),
-    
-    # Cryptocurrency payments
-    'bitcoin': lambda data: f"bitcoin:{data['address']}?amount={data.get('amount', '')}&label={data.get('label', '')}",
-    'ethereum': lambda data: f"ethereum:{data['address']}?value={data.get('value', '')}",
-    
-    # Social media profiles
-    'twitter': lambda data: f"https://twitter.com/{data}",
-    'linkedin': lambda data: f"https://linkedin.com/in/{data}",
-    'github': lambda data: f"https://github.com/{data}",
-    
-    # App store links
-    'playstore': lambda data: f"market://details?id={data}",
-    'appstore': lambda data: f"https://apps.apple.com/app/id{data}"
-}
-
-# Usage examples in comments:
-"""
-Examples of using different data types:
-
-1. WiFi Configuration:
-   wifi_data = {
-       'type': 'WPA',
-       'ssid': 'MyNetwork',
-       'password': 'MyPassword'
-   }
-
-2. Calendar Event:
-   calendar_data = {
-       'summary': 'Team Meeting',
-       'start': '20240224T140000Z',
-       'end': '20240224T150000Z',
-       'location': 'Conference Room',
-       'description': 'Weekly team sync'
-   }
-
-3. VCard Contact:
-   vcard_data = [
-       ('FN', 'John Doe'),
-       ('TEL', '+1234567890'),
-       ('EMAIL', 'john@example.com'),
-       ('ORG', 'Company Name'),
-       ('TITLE', 'Software Engineer')
-   ]
-
-4. Cryptocurrency Payment:
-   crypto_data = {
-       'address': '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa',
-       'amount': '0.001',
-       'label': 'Payment for services'
-   }
-"""
-
-def generate_qr_code(data, fill_color="black", back_color="white"):
-    
-    qr = QRCode(version=3, error_correction=ERROR_CORRECT_L, box_size=10, border=4)
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    # Create QR code image
-    img = qr.make_image(fill_color=fill_color, back_color=back_color)
-    
-    # Convert to base64
+# qrcode, PIL, numpy, cv2 and pyzbar (and qr_raster/qr_video, which need them)
+# are imported where they are used, so importing this module for validation,
+# cache keys or data_encode stays cheap.
+
+COLOR_PATTERN = re.compile(r'^(#[0-9a-fA-F]{3}|#[0-9a-fA-F]{6}|[a-zA-Z]{3,20})$')
+IMAGE_FORMATS = {'png': 'image/png', 'png1': 'image/png', 'svg': 'image/svg+xml', 'webp': 'image/webp'}
+FILE_EXTENSIONS = {'png': 'png', 'png1': 'png', 'svg': 'svg', 'webp': 'webp'}
+ERROR_CORRECTION = qr_plan.LEVEL_CONSTANTS
+MAX_DATA_LENGTH = 2953
+# Largest rendered width/height in pixels; box_size 40 on a version 40 code would be 8.6k px square.
+MAX_IMAGE_SIDE = 4096
+# Part of every ETag, render-cache key and disk-cache directory. Bump it whenever
+# the bytes rendered for the same parameters can change (planner, encoders,
+# rasteriser), or clients and the disk tier keep serving the old images.
+QR_RENDER_VERSION = 3
+
+
+def validate_qr_params(data, fill_color, back_color, image_format='png', box_size=10, border=4,
+                       error_correction='L'):
+    if not data or len(data.encode('utf-8')) > MAX_DATA_LENGTH:
+        raise ValueError(f"QR data must be between 1 and {MAX_DATA_LENGTH} bytes")
+    for color in (fill_color, back_color):
+        if not COLOR_PATTERN.match(color or ''):
+            raise ValueError(f"Invalid colour: {color!r}")
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported format: {image_format!r}")
+    if not 1 <= box_size <= 40 or not 0 <= border <= 20:
+        raise ValueError("box_size must be 1-40 and border 0-20")
+    if error_correction not in ERROR_CORRECTION:
+        raise ValueError(f"Unsupported error correction level: {error_correction!r}")
+    plan = qr_plan.plan_qr(data, error_correction)
+    side = (17 + 4 * plan.version + 2 * border) * box_size
+    if side > MAX_IMAGE_SIDE:
+        raise ValueError(f"The image would be {side} pixels wide; the limit is {MAX_IMAGE_SIDE}")
+
+
+def qr_etag(data, fill_color="black", back_color="white", image_format='png', box_size=10, border=4,
+            error_correction='L'):
+    key = '\0'.join(str(v) for v in (
+        QR_RENDER_VERSION, data, fill_color.lower(), back_color.lower(), image_format, box_size, border, error_correction,
+    ))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _svg_bytes(matrix, fill_color, back_color, box_size):
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+            else:
+                x += 1
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="100%" height="100%" fill="{back_color}"/>'
+        f'<path fill="{fill_color}" d="{"".join(path)}"/></svg>'
+    ).encode('utf-8')
+
+
+def render_qr_code(data, fill_color="black", back_color="white", image_format='png', box_size=10, border=4,
+                   error_correction='L'):
+    validate_qr_params(data, fill_color, back_color, image_format, box_size, border, error_correction)
+    key = qr_etag(data, fill_color, back_color, image_format, box_size, border, error_correction)
+    return render_cache.get_or_render(key, lambda: _render(
+        data, fill_color, back_color, image_format, box_size, border, error_correction,
+    ))
+
+
+def _webp_bytes(modules, fill_color, back_color, box_size):
+    # Two-colour palette image scaled with nearest neighbour, saved losslessly.
+    import numpy as np
+    from PIL import Image
+    from scripts import qr_raster
+
+    image = Image.fromarray(modules.view(np.uint8))
+    image.putpalette(qr_raster.rgb(back_color) + qr_raster.rgb(fill_color))
+    size = modules.shape[0] * box_size
     buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    
-    return f"data:image/png;base64,{img_str}"
+    image.resize((size, size), Image.Resampling.NEAREST).save(buffered, format='WEBP', lossless=True, quality=100, method=4)
+    return buffered.getvalue()
+
+
+def _render(data, fill_color, back_color, image_format, box_size, border, error_correction):
+    from qrcode import QRCode
+    from scripts import qr_raster
+
+    # Version and level come from the memoised planner, so make() skips the best-fit search.
+    plan = qr_plan.plan_qr(data, error_correction)
+    qr = QRCode(version=plan.version, error_correction=ERROR_CORRECTION[plan.error_correction],
+                box_size=box_size, border=border)
+    qr.add_data(qr_plan.segment(data))
+    qr.make(fit=False)
+
+    if image_format == 'svg':
+        return _svg_bytes(qr.get_matrix(), fill_color, back_color, box_size)
 
+    modules = qr_raster.module_array(qr.get_matrix())
+    if image_format == 'webp':
+        return _webp_bytes(modules, fill_color, back_color, box_size)
+    # 'png1' is always a 1-bit palette PNG. 'png' matches the old PIL output: 1-bit
+    # for plain black on white, RGB once custom colours are involved.
+    monochrome = (qr_raster.rgb(fill_color), qr_raster.rgb(back_color)) == ((0, 0, 0), (255, 255, 255))
+    palette = image_format == 'png1' or monochrome
+    return qr_raster.encode_png(modules, box_size, fill_color, back_color, palette=palette)
 
 
-def scan_from_camera():
-    cap = cv2.VideoCapture(0)
+def generate_qr_code(data, fill_color="black", back_color="white", image_format='png', box_size=10, border=4):
+    image = render_qr_code(data, fill_color, back_color, image_format, box_size, border)
+    img_str = base64.b64encode(image).decode()
+    return f"data:{IMAGE_FORMATS[image_format]};base64,{img_str}"
+
+
+
+def scan_from_camera(source=0, headless=False, **options):
+    """Scan a camera (or any cv2.VideoCapture source).
+
+    By default a preview window is shown until a code is read, and its data is
+    returned. With headless=True no window is opened and a generator of every
+    distinct code is returned instead; options go to qr_video.scan_video.
+    """
+    if headless:
+        from scripts import qr_video
+        return qr_video.scan_video(source, **options)
+
+    import cv2
+    import numpy as np
+    from pyzbar.pyzbar import decode
+
+    cap = cv2.VideoCapture(source)
     data_stored = None
     
     while data_stored is None:
@@ -149,19 +175,14 @@ def scan_from_camera():
     return data_stored 
 
 
-def scan_from_file(file_obj=None):
-    try:
-        if file_obj:
-            image = Image.open(file_obj)
-        else:
-            return "No file provided"
-            
-        decoded_objects = decode(image)
-        
-        if decoded_objects:
-            return decoded_objects[0].data.decode('utf-8')
-        return "No QR code found in image"
-        
-    except Exception as e:
-        return f"Error scanning QR code: {str(e)}"
+def scan_from_file(file_obj=None, workers=None, **limits):
+    """Every code in an uploaded image, PDF or multi-frame TIFF.
+
+    Returns a list of {'data', 'type', 'polygon', 'frame'} dicts; unreadable
+    input raises ValueError. limits are max_pixels, max_frames and deadline,
+    see qr_scan.scan_file.
+    """
+    if not file_obj:
+        raise ValueError("No file provided")
+    return qr_scan.scan_file(file_obj, workers, **limits)
     
@@ -1,22 +1,50 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Service, User, Alphabet, Word
+from .catalogue import service_catalogue
+from .models import Service, User, Alphabet, Word, Job
 
 # Register your models here.
 class WordAdmin(admin.ModelAdmin):
     list_display = ['word', 'type', 'description']
-    ordering = ['id_alphabet']  # Default ordering A-Z
+    ordering = ['id_alphabet', 'word_lower']  # Default ordering A-Z, served by word_alphabet_key_idx
+    show_full_result_count = False
     search_fields = ['word', 'type']
     list_filter = ['type', 'id_alphabet']
 
 class ServiceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'description']
+    list_display = ['name', 'description', 'available']
     search_fields = ['name']
     list_filter = ['available']
     ordering = ['name']
+    actions = ['make_available', 'make_unavailable', 'refresh_catalogue']
+
+    # Bulk updates skip post_save, so these bump the home page catalogue themselves.
+    @admin.action(description='Mark selected services available')
+    def make_available(self, request, queryset):
+        queryset.update(available=True)
+        service_catalogue.invalidate()
+
+    @admin.action(description='Mark selected services coming soon')
+    def make_unavailable(self, request, queryset):
+        queryset.update(available=False)
+        service_catalogue.invalidate()
+
+    @admin.action(description='Refresh the home page catalogue')
+    def refresh_catalogue(self, request, queryset):
+        service_catalogue.invalidate()
+        service_catalogue.warm()
+        self.message_user(request, 'Home page catalogue refreshed.')
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'user', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    ordering = ['-created_at']
+    readonly_fields = ['kind', 'payload', 'upload', 'result', 'error', 'attempts', 'worker',
+                       'created_at', 'started_at', 'finished_at']
 
 
 admin.site.register(User, UserAdmin)
 admin.site.register(Service, ServiceAdmin)
 admin.site.register(Alphabet)
 admin.site.register(Word, WordAdmin)
+admin.site.register(Job, JobAdmin)
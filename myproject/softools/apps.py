@@ -1,6 +1,30 @@
+from pathlib import Path
+
 from django.apps import AppConfig
 
 
 class SoftoolsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'softools'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from django.conf import settings
+        from scripts.qr_batch import batch_pool
+        from scripts.qr_cache import render_cache
+        from scripts.qr_scan import scan_pool
+        from scripts.qrcode_generator import QR_RENDER_VERSION
+
+        options = getattr(settings, 'QR_CACHE', {})
+        directory = Path(options.get('DIRECTORY', Path(settings.MEDIA_ROOT) / 'qr_cache'))
+        render_cache.configure(
+            maxsize=options.get('MAXSIZE', 256),
+            # Images from older renderers stay in their own directory and are never read.
+            directory=directory / f'v{QR_RENDER_VERSION}',
+            max_bytes=options.get('MAX_BYTES', 64 * 1024 * 1024),
+        )
+
+        batch_pool.configure(workers=getattr(settings, 'QR_BATCH_WORKERS', None))
+
+        options = getattr(settings, 'QR_SCAN', {})
+        scan_pool.configure(concurrency=options.get('CONCURRENCY', 2), backlog=options.get('BACKLOG', 4))
@@ -0,0 +1,66 @@
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import Alphabet, Word
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(word_lower: str, pk: int) -> str:
+    return base64.urlsafe_b64encode(f'{pk}:{word_lower}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        pk, word_lower = raw.split(':', 1)
+        return word_lower, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def letter_index() -> List[Dict[str, Any]]:
+    """Letters with their precomputed word counts; never counts the Word table."""
+    return list(Alphabet.objects.order_by('character').values('id', 'character', 'word_count'))
+
+
+def words_page(alphabet: Alphabet, cursor: Optional[str] = None, size: int = PAGE_SIZE) -> Dict[str, Any]:
+    """One keyset page of words for a letter, ordered by (word_lower, id).
+
+    The seek predicate walks the (ID_ALPHABET, word_lower) index, so every page
+    costs the same however deep it is.
+    """
+    size = max(1, min(size, MAX_PAGE_SIZE))
+    words = Word.objects.filter(id_alphabet=alphabet)
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        word_lower, pk = position
+        words = words.filter(Q(word_lower__gt=word_lower) | Q(word_lower=word_lower, pk__gt=pk))
+    rows = list(words.order_by('word_lower', 'pk').values('pk', 'word', 'word_lower', 'type')[:size + 1])
+    has_next = len(rows) > size
+    rows = rows[:size]
+    return {
+        'letter': alphabet.character,
+        'count': alphabet.word_count,
+        'words': [{'word': row['word'], 'type': row['type']} for row in rows],
+        'next': encode_cursor(rows[-1]['word_lower'], rows[-1]['pk']) if has_next else None,
+    }
+
+
+def adjust_word_count(alphabet_id: Optional[int], delta: int) -> None:
+    if alphabet_id is not None:
+        # Clamped, so a delete signalled twice cannot push the count below zero.
+        Alphabet.objects.filter(pk=alphabet_id).update(word_count=Greatest(F('word_count') + delta, 0))
+
+
+def refresh_word_counts() -> None:
+    """Recompute every Alphabet.word_count in one grouped query (after bulk writes)."""
+    counts = dict(Word.objects.values('id_alphabet').annotate(n=Count('pk')).values_list('id_alphabet', 'n'))
+    alphabets = list(Alphabet.objects.all())
+    for alphabet in alphabets:
+        alphabet.word_count = counts.get(alphabet.pk, 0)
+    Alphabet.objects.bulk_update(alphabets, ['word_count'])
@@ -0,0 +1,98 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+from .models import Service
+from .versions import SharedVersion
+
+
+class ServiceCatalogue:
+    """The home page's services and their rendered grid, cached per catalogue version.
+
+    Both are built once per version and kept in process. When
+    SERVICE_CATALOGUE['ALIAS'] names a Django cache they are shared through it
+    too, together with the version, so a bump in one process (a Service signal
+    or admin action) retires every process's copy; see SharedVersion. The grid
+    is rendered once per auth state, since signed-in users see availability and
+    launch links.
+    """
+
+    def __init__(self, alias: Optional[str] = None, timeout: Optional[int] = None):
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._version = SharedVersion('catalogue:version', alias)
+        self._entries: Dict[Any, Any] = {}
+        self._entries_version: Optional[int] = None
+        self._stats = dict.fromkeys(('local_hits', 'shared_hits', 'builds', 'invalidations'), 0)
+
+    @classmethod
+    def from_settings(cls) -> 'ServiceCatalogue':
+        options = getattr(settings, 'SERVICE_CATALOGUE', {})
+        return cls(alias=options.get('ALIAS'), timeout=options.get('TIMEOUT'))
+
+    @property
+    def shared(self) -> Any:
+        return caches[self.alias] if self.alias else None
+
+    def version(self) -> int:
+        return self._version.get()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+        self._version.bump()
+
+    def _get(self, name: Any, version: int, build: Any) -> Any:
+        with self._lock:
+            if self._entries_version != version:
+                self._entries = {}
+                self._entries_version = version
+            if name in self._entries:
+                self._stats['local_hits'] += 1
+                return self._entries[name]
+        key = f"catalogue:{version}:{':'.join(map(str, name))}"
+        value = self.shared.get(key) if self.shared is not None else None
+        if value is not None:
+            stat = 'shared_hits'
+        else:
+            value, stat = build(version), 'builds'
+            if self.shared is not None:
+                self.shared.set(key, value, self.timeout)
+        with self._lock:
+            self._stats[stat] += 1
+            if self._entries_version == version:
+                self._entries[name] = value
+        return value
+
+    def services(self, version: Optional[int] = None) -> List[Service]:
+        version = self.version() if version is None else version
+        return self._get(('services',), version, lambda _: list(Service.objects.order_by('pk')))
+
+    def grid(self, authenticated: bool) -> SafeString:
+        """The rendered services grid for signed-in or anonymous visitors."""
+        version = self.version()
+        html = self._get(('grid', int(authenticated)), version, lambda v: render_to_string('services_grid.html', {
+            'services': self.services(v), 'authenticated': authenticated,
+        }))
+        return mark_safe(html)
+
+    def warm(self) -> int:
+        """Build the services and both grids for the current version; returns it."""
+        version = self.version()
+        self.services(version)
+        self.grid(False)
+        self.grid(True)
+        return version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, version=self._entries_version, entries=len(self._entries))
+
+
+service_catalogue = ServiceCatalogue.from_settings()
@@ -0,0 +1,217 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Max, Sum
+
+from .fulltext import RESULT_FIELDS, get_backend
+from .fuzzy import word_index
+from .models import Alphabet, Word, search_key
+from .versions import SharedVersion
+
+
+class QueryCounter:
+    """Execute wrapper counting the SQL statements run on a connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.split()).lower()
+
+
+class SearchCache:
+    """Two-tier cache of search_word results keyed on the normalised query.
+
+    The first tier is a bounded in-process LRU. When DICTIONARY_CACHE['ALIAS']
+    names a Django cache, results are also shared through it and every entry is
+    stamped with a generation kept in that cache, so an invalidation in one
+    process is seen by all of them. Generations are nanosecond timestamps of the
+    last invalidation (0 until one happens), which doubles as a change marker.
+
+    Without an alias the generation is process-local: a Word saved in one
+    worker is not seen by the others. Local entries then expire after
+    local_ttl seconds, which bounds how long other processes serve stale
+    results.
+    """
+    def __init__(self, maxsize: int = 1024, alias: Optional[str] = None, timeout: Optional[int] = 3600,
+                 local_ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.alias = alias
+        self.timeout = timeout
+        self.local_ttl = local_ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._generation = SharedVersion('dictionary:generation', alias)
+        self._stats = dict.fromkeys(('local_hits', 'shared_hits', 'misses', 'invalidations'), 0)
+
+    @classmethod
+    def from_settings(cls) -> 'SearchCache':
+        options = getattr(settings, 'DICTIONARY_CACHE', {})
+        alias = options.get('ALIAS')
+        return cls(
+            maxsize=options.get('MAXSIZE', 1024),
+            alias=alias,
+            timeout=options.get('TIMEOUT', 3600),
+            # Shared generations already retire local entries; only process-local ones need a TTL.
+            local_ttl=options.get('LOCAL_TTL', None if alias else 30),
+        )
+
+    @property
+    def shared(self) -> Any:
+        return caches[self.alias] if self.alias else None
+
+    def generation(self) -> int:
+        return self._generation.get()
+
+    def _shared_key(self, generation: int, query: str) -> str:
+        return f'dictionary:{generation}:{hashlib.md5(query.encode()).hexdigest()}'
+
+    def get(self, query: str, generation: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and entry[0] == generation and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(query)
+                self._stats['local_hits'] += 1
+                return entry[2]
+        if self.shared is not None:
+            result = self.shared.get(self._shared_key(generation, query))
+            if result is not None:
+                self._store_local(generation, query, result)
+                with self._lock:
+                    self._stats['shared_hits'] += 1
+                return result
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, query: str, result: Dict[str, Any], generation: int) -> None:
+        self._store_local(generation, query, result)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(generation, query), result, self.timeout)
+
+    def _store_local(self, generation: int, query: str, result: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.local_ttl if self.local_ttl is not None else None
+        with self._lock:
+            self._entries[query] = (generation, expires, result)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+        self._generation.bump()
+
+    def validator(self) -> Tuple[Optional[datetime], int]:
+        """(time of the latest Word change, number of words), the same in every process.
+
+        Both come from the database: the indexed Max('updated_at') and the
+        per-letter word counts, so deletions change the validator too. With a
+        shared alias the pair is computed once per generation and kept there,
+        and the shared generation's timestamp stands in for deletions in the
+        time.
+        """
+        generation = self.generation()
+        key = f'dictionary:validator:{generation}'
+        if self.shared is not None:
+            validator = self.shared.get(key)
+            if validator is not None:
+                return validator
+        latest = Word.objects.aggregate(latest=Max('updated_at'))['latest']
+        words = Alphabet.objects.aggregate(words=Sum('word_count'))['words'] or 0
+        if self.shared is not None:
+            if generation:
+                invalidated = datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
+                latest = max(latest, invalidated) if latest else invalidated
+            self.shared.set(key, (latest, words), self.timeout)
+        return latest, words
+
+    def last_modified(self) -> Optional[datetime]:
+        return self.validator()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), maxsize=self.maxsize)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        return stats
+
+
+search_cache = SearchCache.from_settings()
+
+
+def search_word(query: str) -> Dict[str, Any]:
+    """Run the exact -> suggestion -> partial pipeline, normally in at most two round-trips.
+
+    The exact stage is one query, suggestions come from the in-memory fuzzy
+    index and the follow-up stage (suggested rows or full-text hits) is the
+    second. Suggestions whose rows have gone since the index was last checked
+    cost a third, the full-text search. Results are served from search_cache
+    when possible. The number of statements issued is returned under ``queries``.
+    """
+    query = normalize_query(query)
+    with count_queries() as counter:
+        generation = search_cache.generation()
+        result = search_cache.get(query, generation)
+        if result is None:
+            try:
+                result = _run_pipeline(query)
+                search_cache.set(query, result, generation)
+            except Exception as e:
+                result = {'error': f'An error occurred: {str(e)}'}
+    return dict(result, queries=counter.count)
+
+
+def _run_pipeline(query: str) -> Dict[str, Any]:
+    # word_lower is truncated to SEARCH_KEY_LENGTH, so confirm the full word.
+    exact_matches = [
+        row for row in _rows(Word.objects.filter(word_lower=search_key(query)))
+        if row['word'].strip().lower() == query
+    ]
+    if exact_matches:
+        return {'word': exact_matches}
+
+    similar_words = word_index.get_close_matches(query, n=3, cutoff=0.6)
+    if similar_words:
+        rank = {word: i for i, word in enumerate(similar_words)}
+        similar_matches = [
+            row for row in _rows(Word.objects.filter(word_lower__in={search_key(w) for w in similar_words}))
+            if row['word'] in rank
+        ]
+        similar_matches.sort(key=lambda row: rank.get(row['word'], len(rank)))
+        if similar_matches:
+            return {'word': similar_matches, 'suggestion': True}
+        # Every suggestion was deleted since the index was checked; try full text.
+
+    partial_matches = get_backend().search(query, limit=5)
+    if partial_matches:
+        return {'word': partial_matches, 'partial_match': True}
+
+    return {'error': f'No matches found for "{query}"'}
+
+
+def _rows(queryset: Any) -> List[Dict[str, str]]:
+    return list(queryset.values(*RESULT_FIELDS))
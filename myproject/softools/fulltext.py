@@ -0,0 +1,169 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from django.conf import settings
+from django.db import DatabaseError, connection as default_connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Word
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+RESULT_FIELDS = ('word', 'type', 'description')
+
+
+def search_terms(query: str) -> List[str]:
+    return _TERM_RE.findall(query.lower())
+
+
+class SearchBackend:
+    """Ranked partial-match search over Word.word and Word.description.
+
+    The base class is the portable fallback: the original icontains lookup,
+    ranked so that hits on the word itself come before description hits.
+    """
+    vendor: Optional[str] = None
+
+    def __init__(self, connection: Any = None):
+        self.connection = connection or default_connection
+
+    def install(self) -> None:
+        """Create whatever index structures the backend needs; safe to call repeatedly."""
+
+    def uninstall(self) -> None:
+        """Drop the structures created by install()."""
+
+    def rebuild(self) -> None:
+        """Repopulate the index from the Word table."""
+
+    def _fetch(self, sql: str, params: Sequence[Any]) -> List[Dict[str, str]]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [dict(zip(RESULT_FIELDS, row[:3])) for row in cursor.fetchall()]
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        rank = Case(
+            When(word__iexact=query, then=Value(0)),
+            When(word__istartswith=query, then=Value(1)),
+            When(word__icontains=query, then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        )
+        return list(
+            Word.objects.filter(Q(word__icontains=query) | Q(description__icontains=query))
+            .annotate(rank=rank)
+            .order_by('rank', 'word')
+            .values(*RESULT_FIELDS)[:limit]
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """FTS5 external-content table kept in sync with Word by triggers."""
+    vendor = 'sqlite'
+    table = 'Word_fts'
+
+    def _execute(self, *statements: str) -> None:
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def install(self) -> None:
+        t = self.table
+        self._execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {t} USING fts5("
+            f"word, description, content='Word', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_ai AFTER INSERT ON Word BEGIN "
+            f"INSERT INTO {t}(rowid, word, description) VALUES (new.id, new.word, new.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_ad AFTER DELETE ON Word BEGIN "
+            f"INSERT INTO {t}({t}, rowid, word, description) VALUES ('delete', old.id, old.word, old.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS {t}_au AFTER UPDATE ON Word BEGIN "
+            f"INSERT INTO {t}({t}, rowid, word, description) VALUES ('delete', old.id, old.word, old.description); "
+            f"INSERT INTO {t}(rowid, word, description) VALUES (new.id, new.word, new.description); END",
+        )
+
+    def uninstall(self) -> None:
+        t = self.table
+        self._execute(
+            f"DROP TRIGGER IF EXISTS {t}_ai",
+            f"DROP TRIGGER IF EXISTS {t}_ad",
+            f"DROP TRIGGER IF EXISTS {t}_au",
+            f"DROP TABLE IF EXISTS {t}",
+        )
+
+    def rebuild(self) -> None:
+        self.install()
+        self._execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"*' for term in terms)
+        try:
+            return self._fetch(
+                f"SELECT Word.word, Word.type, Word.description FROM {self.table} "
+                f"JOIN Word ON Word.id = {self.table}.rowid "
+                f"WHERE {self.table} MATCH %s ORDER BY bm25({self.table}, 10.0, 1.0) LIMIT %s",
+                [match, limit],
+            )
+        except DatabaseError:
+            # Index not installed (e.g. SQLite built without FTS5).
+            return super().search(query, limit)
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """InnoDB FULLTEXT index queried with MATCH ... AGAINST."""
+    vendor = 'mysql'
+    index = 'Word_fulltext'
+    min_token_size = 3
+
+    def install(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SHOW INDEX FROM Word WHERE Key_name = %s", [self.index])
+            if not cursor.fetchall():
+                cursor.execute(f"CREATE FULLTEXT INDEX {self.index} ON Word (word, description)")
+
+    def uninstall(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {self.index} ON Word")
+
+    def rebuild(self) -> None:
+        try:
+            self.uninstall()
+        except DatabaseError:
+            pass
+        self.install()
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        terms = [term for term in search_terms(query) if len(term) >= self.min_token_size]
+        if not terms:
+            # Shorter terms are never indexed by InnoDB, use the LIKE lookup instead.
+            return super().search(query, limit)
+        boolean = ' '.join(f'+{term}*' for term in terms)
+        try:
+            return self._fetch(
+                "SELECT word, type, description, "
+                "MATCH(word, description) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score FROM Word "
+                "WHERE MATCH(word, description) AGAINST (%s IN BOOLEAN MODE) "
+                "ORDER BY score DESC, word LIMIT %s",
+                [' '.join(terms), boolean, limit],
+            )
+        except DatabaseError:
+            # No FULLTEXT index (missing, or mid-rebuild in rebuild_search_index).
+            return super().search(query, limit)
+
+
+BACKENDS: Dict[str, Type[SearchBackend]] = {
+    'sqlite': SQLiteFTS5Backend,
+    'mysql': MySQLFulltextBackend,
+}
+
+
+def get_backend(connection: Any = None) -> SearchBackend:
+    """Return the search backend for the connection, or DICTIONARY_SEARCH_BACKEND if set."""
+    connection = connection or default_connection
+    path = getattr(settings, 'DICTIONARY_SEARCH_BACKEND', None)
+    backend_class = import_string(path) if path else BACKENDS.get(connection.vendor, SearchBackend)
+    return backend_class(connection)
@@ -0,0 +1,271 @@
+import bisect
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+Token = Tuple[str, int]
+
+logger = logging.getLogger(__name__)
+
+
+def _tokens(word: str) -> List[Token]:
+    """Split a word into (char, occurrence) tokens so multiset overlap is a set overlap."""
+    seen: Dict[str, int] = defaultdict(int)
+    tokens = []
+    for char in word:
+        seen[char] += 1
+        tokens.append((char, seen[char]))
+    return tokens
+
+
+class WordIndex:
+    """Process-local index over (pk, word) rows, rebuilt when the dictionary changes.
+
+    Same-process saves and deletes reach the index through signals. Changes made
+    by other processes (admin edits in another worker, import_dictionary) are
+    caught by the version source, which returns a value that changes with every
+    Word change anywhere: the index remembers the version it was built at,
+    compares it with the current one at most every ``recheck`` seconds (or on
+    every lookup that passes a version) and rebuilds when they differ.
+    """
+
+    def __init__(self, loader=None, version=None, recheck: float = 5.0):
+        self._loader = loader
+        self._version_source = version
+        self.recheck = recheck
+        self._lock = threading.RLock()
+        self._ready = False
+        self._version: Any = None
+        self._checked = 0.0
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    def _build(self, rows: Iterable[Tuple[int, str]]) -> None:
+        raise NotImplementedError
+
+    def load(self, rows: Optional[Iterable[Tuple[int, str]]] = None, version: Any = None) -> None:
+        """Build the index from rows, or the loader, unless it is built at the current version.
+
+        version is the dictionary version the rows reflect; when it is omitted
+        the version source is asked, for a built index only once a recheck is due.
+        """
+        with self._lock:
+            if self._ready:
+                if version is None and self._version_source is not None \
+                        and time.monotonic() - self._checked >= self.recheck:
+                    version = self._version_source()
+                    self._checked = time.monotonic()
+                if version is None or version == self._version:
+                    return
+            elif version is None and self._version_source is not None:
+                # Read before the rows, so a change in between triggers another rebuild.
+                version = self._version_source()
+            self._clear()
+            if rows is None:
+                rows = self._loader() if self._loader else ()
+            self._build(rows)
+            self._version = version
+            self._checked = time.monotonic()
+            self._ready = True
+
+    def add(self, pk: int, word: str) -> None:
+        with self._lock:
+            if not self._ready:
+                return
+            self._discard(pk)
+            self._insert(pk, word)
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            if self._ready:
+                self._discard(pk)
+
+    def invalidate(self) -> None:
+        """Drop the index; it is rebuilt on the next lookup."""
+        with self._lock:
+            self._ready = False
+            self._version = None
+            self._clear()
+
+
+class FuzzyIndex(WordIndex):
+    """Process-local character index returning the same suggestions as difflib.get_close_matches.
+
+    Every word with ``ratio() >= cutoff`` shares at least ``cutoff * (len(a) + len(b)) / 2``
+    characters with the query, so within each admissible word length it must contain
+    one of the query's rarest ``len(query) - threshold + 1`` tokens. Only words holding
+    one of those tokens are scored with SequenceMatcher.
+    """
+
+    def __init__(self, loader=None, version=None, recheck: float = 5.0):
+        super().__init__(loader, version, recheck)
+        self._by_pk: Dict[int, str] = {}
+        self._counts: Counter = Counter()
+        self._postings: Dict[Tuple[int, Token], Set[str]] = defaultdict(set)
+
+    def _clear(self) -> None:
+        self._by_pk.clear()
+        self._counts.clear()
+        self._postings.clear()
+
+    def _build(self, rows: Iterable[Tuple[int, str]]) -> None:
+        for pk, word in rows:
+            self._insert(pk, word)
+
+    def _insert(self, pk: int, word: str) -> None:
+        self._by_pk[pk] = word
+        self._counts[word] += 1
+        if self._counts[word] == 1:
+            for token in _tokens(word):
+                self._postings[len(word), token].add(word)
+
+    def _discard(self, pk: int) -> None:
+        word = self._by_pk.pop(pk, None)
+        if word is None:
+            return
+        self._counts[word] -= 1
+        if self._counts[word] <= 0:
+            del self._counts[word]
+            for token in _tokens(word):
+                key = (len(word), token)
+                bucket = self._postings.get(key)
+                if bucket is not None:
+                    bucket.discard(word)
+                    if not bucket:
+                        del self._postings[key]
+
+    def __len__(self) -> int:
+        return len(self._by_pk)
+
+    def candidates(self, query: str, cutoff: float = 0.6) -> Set[str]:
+        la = len(query)
+        if not la or not cutoff:
+            return set(self._counts)
+        tokens = _tokens(query)
+        min_len = math.ceil(la * cutoff / (2.0 - cutoff) - 1e-9)
+        max_len = math.floor(la * (2.0 - cutoff) / cutoff + 1e-9)
+        found: Set[str] = set()
+        for lb in range(max(1, min_len), max_len + 1):
+            threshold = max(1, math.ceil(cutoff * (la + lb) / 2.0 - 1e-9))
+            if threshold > min(la, lb):
+                continue
+            postings = [self._postings.get((lb, token), ()) for token in tokens]
+            postings.sort(key=len)
+            for bucket in postings[:la - threshold + 1]:
+                found.update(bucket)
+        return found
+
+    def get_close_matches(self, query: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+        self.load()
+        with self._lock:
+            candidates = [(word, self._counts[word]) for word in self.candidates(query, cutoff)]
+
+        result = []
+        s = SequenceMatcher()
+        s.set_seq2(query)
+        for word, count in candidates:
+            s.set_seq1(word)
+            if s.real_quick_ratio() >= cutoff and \
+               s.quick_ratio() >= cutoff and \
+               s.ratio() >= cutoff:
+                result.extend([(s.ratio(), word)] * count)
+
+        return [word for _, word in heapq.nlargest(n, result)]
+
+
+class PrefixIndex(WordIndex):
+    """Sorted, case-insensitive word list answering prefix lookups with bisect."""
+
+    def __init__(self, loader=None, version=None, recheck: float = 5.0):
+        super().__init__(loader, version, recheck)
+        self._by_pk: Dict[int, Tuple[str, str]] = {}
+        self._counts: Counter = Counter()
+        self._keys: List[Tuple[str, str]] = []
+
+    def _clear(self) -> None:
+        self._by_pk.clear()
+        self._counts.clear()
+        self._keys = []
+
+    def _build(self, rows: Iterable[Tuple[int, str]]) -> None:
+        for pk, word in rows:
+            entry = (word.lower(), word)
+            self._by_pk[pk] = entry
+            self._counts[entry] += 1
+        self._keys = sorted(self._counts)
+
+    def _insert(self, pk: int, word: str) -> None:
+        entry = (word.lower(), word)
+        self._by_pk[pk] = entry
+        self._counts[entry] += 1
+        if self._counts[entry] == 1:
+            bisect.insort(self._keys, entry)
+
+    def _discard(self, pk: int) -> None:
+        entry = self._by_pk.pop(pk, None)
+        if entry is None:
+            return
+        self._counts[entry] -= 1
+        if self._counts[entry] <= 0:
+            del self._counts[entry]
+            i = bisect.bisect_left(self._keys, entry)
+            if i < len(self._keys) and self._keys[i] == entry:
+                del self._keys[i]
+
+    def complete(self, prefix: str, limit: int = 10, version: Any = None) -> List[str]:
+        """Words starting with prefix; pass the response's validator as version to match it."""
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        self.load(version=version)
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix,))
+            results = []
+            for key, word in self._keys[i:i + limit]:
+                if not key.startswith(prefix):
+                    break
+                results.append(word)
+            return results
+
+
+def _load_words() -> List[Tuple[int, str]]:
+    # Pks are kept so the save/delete signals can update the indexes in place.
+    from .models import Word
+    return list(Word.objects.values_list('pk', 'word'))
+
+
+def _words_version() -> Any:
+    # The validator behind the dictionary ETags: Max(updated_at) and the word count.
+    from .dictionary import search_cache
+    return search_cache.validator()
+
+
+_recheck = getattr(settings, 'DICTIONARY_CACHE', {}).get('INDEX_RECHECK', 5)
+word_index = FuzzyIndex(loader=_load_words, version=_words_version, recheck=_recheck)
+prefix_index = PrefixIndex(loader=_load_words, version=_words_version, recheck=_recheck)
+
+
+def warm() -> None:
+    """Build both word indexes from one query; called once when a web worker starts."""
+    from django.db import DatabaseError
+    try:
+        version = _words_version()
+        rows = _load_words()
+    except DatabaseError:
+        # No Word table yet (fresh database); the first lookup builds the indexes.
+        logger.warning('Word indexes not warmed', exc_info=True)
+        return
+    word_index.load(rows, version)
+    prefix_index.load(rows, version)
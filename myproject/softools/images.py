@@ -0,0 +1,266 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# Formats are tried in order by <picture>; the fallback is JPEG, or PNG for images with transparency.
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+PRESETS = {
+    # Service cards are at most ~360 CSS px wide in the grid.
+    'card': (320, 480, 640, 960),
+    # The navbar avatar is 32 px and the profile picture 150 px.
+    'avatar': (64, 160, 320),
+}
+# Which presets the upload signal and the backfill command build for each image field.
+FIELD_PRESETS = {
+    ('softools.Service', 'image'): ('card',),
+    ('softools.User', 'pic'): ('avatar',),
+}
+# Shown while an uploaded profile picture waits for the worker.
+PLACEHOLDER_NAME = 'profile_pics/processing.png'
+
+
+def image_errors() -> Tuple[type, ...]:
+    """What reading an unreadable or hostile upload raises; use as `except image_errors():`.
+
+    A function so PIL is only imported once an exception is being matched.
+    """
+    from PIL import Image
+    return (OSError, ValueError, Image.DecompressionBombError)
+
+
+class ImageVariants:
+    """Resized AVIF/WebP/JPEG copies of uploaded images, named by content hash.
+
+    Variants of an original live under <DIRECTORY>/<hash>/<width>.<ext> in the
+    original's storage, so identical uploads share them and a name never
+    changes meaning (safe to cache forever). A small JSON manifest per
+    original name records the hash and the variants built so far; manifests
+    are also kept in a bounded in-process LRU, so rendering a srcset normally
+    costs no I/O. Widths above the original's are never built: the original
+    width is used instead.
+    """
+
+    def __init__(self, directory: str = 'variants', formats: Sequence[str] = ('avif', 'webp'),
+                 quality: int = 80, maxsize: int = 1024):
+        self.directory = directory.strip('/')
+        self.formats = tuple(formats)
+        self.quality = quality
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._manifests: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    @classmethod
+    def from_settings(cls) -> 'ImageVariants':
+        options = getattr(settings, 'IMAGE_VARIANTS', {})
+        return cls(
+            directory=options.get('DIRECTORY', 'variants'),
+            formats=options.get('FORMATS', ('avif', 'webp')),
+            quality=options.get('QUALITY', 80),
+            maxsize=options.get('MAXSIZE', 1024),
+        )
+
+    def available_formats(self) -> List[str]:
+        from PIL import features
+        # AVIF needs Pillow 11.2+ built with libavif; WebP is in every current wheel.
+        return [fmt for fmt in self.formats if fmt in ('avif', 'webp') and features.check(fmt)]
+
+    def _manifest_name(self, name: str) -> str:
+        return f'{self.directory}/manifests/{hashlib.sha1(name.encode()).hexdigest()}.json'
+
+    def _remember(self, name: str, manifest: Dict[str, Any]) -> None:
+        with self._lock:
+            self._manifests[name] = manifest
+            self._manifests.move_to_end(name)
+            while len(self._manifests) > self.maxsize:
+                self._manifests.popitem(last=False)
+
+    def manifest(self, field_file: Any) -> Optional[Dict[str, Any]]:
+        """The recorded manifest for this file, or None if nothing has been built yet."""
+        name = field_file.name
+        with self._lock:
+            manifest = self._manifests.get(name)
+        if manifest is not None:
+            return manifest
+        storage = field_file.storage
+        manifest_name = self._manifest_name(name)
+        if not storage.exists(manifest_name):
+            return None
+        with storage.open(manifest_name, 'rb') as f:
+            manifest = json.load(f)
+        self._remember(name, manifest)
+        return manifest
+
+    def build(self, field_file: Any, widths: Sequence[int], force: bool = False) -> Dict[str, Any]:
+        """Make sure every variant for widths exists; returns the updated manifest."""
+        from PIL import Image, ImageOps
+
+        storage = field_file.storage
+        manifest = None if force else self.manifest(field_file)
+        if manifest is not None and all(self._target(manifest, w) in manifest['widths'] for w in widths):
+            return manifest
+
+        with storage.open(field_file.name, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        with Image.open(BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+            image = image.convert('RGBA' if alpha else 'RGB')
+            manifest = {
+                'hash': digest,
+                'width': image.width,
+                'height': image.height,
+                'fallback': 'png' if alpha else 'jpeg',
+                'formats': self.available_formats(),
+                'widths': sorted(set(manifest['widths'] if manifest and manifest['hash'] == digest else [])),
+            }
+            for width in sorted({self._target(manifest, w) for w in widths} - set(manifest['widths'])):
+                resized = image if width == image.width else image.resize(
+                    (width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS,
+                )
+                for fmt in manifest['formats'] + [manifest['fallback']]:
+                    self._save(storage, self.variant_name(manifest, width, fmt), resized, fmt, force)
+                manifest['widths'] = sorted(manifest['widths'] + [width])
+
+        storage.delete(self._manifest_name(field_file.name))
+        storage.save(self._manifest_name(field_file.name), ContentFile(json.dumps(manifest).encode()))
+        self._remember(field_file.name, manifest)
+        return manifest
+
+    def _target(self, manifest: Dict[str, Any], width: int) -> int:
+        return min(width, manifest['width'])
+
+    def _save(self, storage: Any, name: str, image: Any, fmt: str, force: bool) -> None:
+        if storage.exists(name):
+            if not force:
+                return
+            storage.delete(name)
+        buffered = BytesIO()
+        if fmt == 'jpeg':
+            image.save(buffered, format='JPEG', quality=self.quality, optimize=True, progressive=True)
+        elif fmt == 'png':
+            image.save(buffered, format='PNG', optimize=True)
+        elif fmt == 'webp':
+            image.save(buffered, format='WEBP', quality=self.quality, method=4)
+        else:
+            # AVIF holds up at lower quality settings; this lands near the WebP sizes.
+            image.save(buffered, format='AVIF', quality=self.quality - 20)
+        # Nothing in the image metadata is carried over, EXIF included.
+        storage.save(name, ContentFile(buffered.getvalue()))
+
+    def variant_name(self, manifest: Dict[str, Any], width: int, fmt: str) -> str:
+        return f"{self.directory}/{manifest['hash']}/{width}.{EXTENSIONS[fmt]}"
+
+    def sources(self, field_file: Any, widths: Sequence[int]) -> Optional[Dict[str, Any]]:
+        """{'sources': [(mime, srcset)], 'src', 'srcset', 'width', 'height'} for a <picture>.
+
+        Variants are built on first use if the upload hook or backfill has not
+        made them yet. Returns None when the original cannot be read.
+        """
+        try:
+            manifest = self.build(field_file, widths)
+        except image_errors():
+            return None
+        storage = field_file.storage
+        targets = sorted({self._target(manifest, w) for w in widths})
+
+        def srcset(fmt: str) -> str:
+            return ', '.join(f'{storage.url(self.variant_name(manifest, w, fmt))} {w}w' for w in targets)
+
+        fallback = manifest['fallback']
+        return {
+            'sources': [(MIME_TYPES[fmt], srcset(fmt)) for fmt in manifest['formats']],
+            'src': storage.url(self.variant_name(manifest, targets[-1], fallback)),
+            'srcset': srcset(fallback),
+            'width': targets[-1],
+            'height': round(manifest['height'] * targets[-1] / manifest['width']),
+        }
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._manifests.pop(name, None)
+
+
+image_variants = ImageVariants.from_settings()
+
+
+def build_for_instance(instance: Any, force: bool = False) -> int:
+    """Build the configured presets for every image field of instance; returns the fields built."""
+    built = 0
+    for (label, field_name), presets in FIELD_PRESETS.items():
+        field_file = getattr(instance, field_name) if instance._meta.label == label else None
+        if not field_file or not field_file.storage.exists(field_file.name):
+            continue
+        widths = sorted({width for preset in presets for width in PRESETS[preset]})
+        image_variants.build(field_file, widths, force=force)
+        built += 1
+    return built
+
+
+def profile_picture_settings() -> Dict[str, Any]:
+    options = getattr(settings, 'PROFILE_PICTURE', {})
+    return {
+        'max_bytes': options.get('MAX_BYTES', 5 * 1024 * 1024),
+        'max_pixels': options.get('MAX_PIXELS', 24_000_000),
+        'max_side': options.get('MAX_SIDE', 1024),
+        'quality': options.get('QUALITY', 85),
+    }
+
+
+def check_upload(upload: Any, max_bytes: int, max_pixels: int) -> None:
+    """Reject oversized or non-image uploads from the file header alone; no pixels are decoded."""
+    from PIL import Image
+
+    if upload.size > max_bytes:
+        raise ValueError(f'Pictures can be at most {max_bytes // (1024 * 1024)} MB')
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValueError('The uploaded file is not a supported image') from None
+    finally:
+        upload.seek(0)
+    if width * height > max_pixels:
+        raise ValueError(f'The picture is {width}x{height} pixels; the limit is {max_pixels} pixels')
+
+
+def placeholder(storage: Any) -> str:
+    """Name of the shared placeholder picture in storage, creating it on first use."""
+    if not storage.exists(PLACEHOLDER_NAME):
+        from PIL import Image
+
+        buffered = BytesIO()
+        Image.new('RGB', (160, 160), (226, 232, 240)).save(buffered, format='PNG')
+        storage.save(PLACEHOLDER_NAME, ContentFile(buffered.getvalue()))
+    return PLACEHOLDER_NAME
+
+
+def normalise(file_obj: Any, max_side: int, quality: int, max_pixels: int) -> bytes:
+    """The image upright, no larger than max_side, as a progressive JPEG without metadata.
+
+    JPEGs are decoded at the smallest DCT scale that still covers max_side, so
+    a 12 MP photo never expands to full size in memory. Transparency is
+    flattened onto white.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(file_obj) as image:
+        if image.width * image.height > max_pixels:
+            raise ValueError(f'The picture is {image.width}x{image.height} pixels; the limit is {max_pixels} pixels')
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        buffered = BytesIO()
+        image.convert('RGB').save(buffered, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffered.getvalue()
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import urllib.request
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from scripts import qr_scan, qrcode_generator
+from . import images
+from .models import Job, User
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: Dict[str, Callable[[Job], Any]] = {}
+FAILURE_HANDLERS: Dict[str, Callable[[Job], Any]] = {}
+
+
+def job_settings() -> Dict[str, Any]:
+    options = getattr(settings, 'JOBS', {})
+    return {
+        'concurrency': options.get('CONCURRENCY', os.cpu_count() or 1),
+        'poll_interval': options.get('POLL_INTERVAL', 0.5),
+        'lease': options.get('LEASE', 300),
+        'max_attempts': options.get('MAX_ATTEMPTS', 3),
+        'retention': options.get('RETENTION', 24 * 60 * 60),
+        'callback_hosts': set(options.get('CALLBACK_HOSTS', ())),
+    }
+
+
+def register(kind: str, on_failure: Optional[Callable[[Job], Any]] = None) -> Callable:
+    """Register the function that runs jobs of this kind; its return value is the job result.
+
+    on_failure, if given, is called once a job of this kind has failed for
+    good: its handler raised, or it ran out of attempts on dead workers.
+    """
+    def decorator(func: Callable[[Job], Any]) -> Callable[[Job], Any]:
+        HANDLERS[kind] = func
+        if on_failure is not None:
+            FAILURE_HANDLERS[kind] = on_failure
+        return func
+    return decorator
+
+
+def submit(kind: str, payload: Dict[str, Any], user: Any = None, upload: Any = None) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    callback = payload.get('callback_url')
+    if callback and urlsplit(callback).hostname not in job_settings()['callback_hosts']:
+        raise ValueError("callback_url host is not allowed")
+    job = Job(kind=kind, payload=payload, user=user if user and user.is_authenticated else None)
+    if upload is not None:
+        job.upload.save(os.path.basename(upload.name), upload, save=False)
+    job.save()
+    return job
+
+
+def claim(worker: str, limit: int) -> List[Any]:
+    """Atomically take up to `limit` of the oldest queued jobs; returns their pks.
+
+    Each claim is a conditional UPDATE, so competing workers never run the same
+    job; this works the same on MySQL and SQLite without row locks.
+    """
+    claimed = []
+    candidates = Job.objects.filter(status=Job.QUEUED).order_by('created_at').values_list('pk', flat=True)
+    for pk in candidates[:limit * 2]:
+        if len(claimed) == limit:
+            break
+        updated = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale(lease: int, max_attempts: int) -> int:
+    """Return jobs whose worker died mid-run to the queue, or fail them after max_attempts."""
+    cutoff = timezone.now() - timedelta(seconds=lease)
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff)
+    failed = 0
+    for job in stale.filter(attempts__gte=max_attempts):
+        # Conditional, like claim(), so a job that just finished is left alone.
+        if Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+            status=Job.FAILED, error='Worker did not finish the job', finished_at=timezone.now(),
+        ):
+            failed += 1
+            failure_hook(job)
+            if job.upload:
+                job.upload.delete(save=True)
+    return failed + stale.update(status=Job.QUEUED, worker='', started_at=None)
+
+
+def failure_hook(job: Job) -> None:
+    if job.kind not in FAILURE_HANDLERS:
+        return
+    try:
+        FAILURE_HANDLERS[job.kind](job)
+    except Exception:  # Cleanup is best effort; the job is already recorded as failed.
+        logger.exception('Failure handler for job %s failed', job.pk)
+
+
+def purge_finished(retention: int) -> int:
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    count = 0
+    for job in Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).iterator():
+        if job.upload:
+            job.upload.delete(save=False)
+        if job.result and job.result.get('file'):
+            default_storage.delete(job.result['file'])
+        job.delete()
+        count += 1
+    return count
+
+
+def run_job(pk: Any) -> str:
+    """Run one claimed job to completion; safe to call in a worker process."""
+    close_old_connections()
+    job = Job.objects.get(pk=pk)
+    try:
+        job.result = HANDLERS[job.kind](job)
+        job.status = Job.DONE
+    except ValueError as e:
+        job.status, job.error = Job.FAILED, str(e)
+    except Exception as e:  # Any other handler failure is recorded on the job, not raised.
+        logger.exception('Job %s failed', job.pk)
+        job.status, job.error = Job.FAILED, f'{type(e).__name__}: {e}'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'error', 'finished_at'])
+    if job.status == Job.FAILED:
+        failure_hook(job)
+    if job.upload:
+        job.upload.delete(save=True)
+    if job.payload.get('callback_url'):
+        notify(job)
+    return job.status
+
+
+def job_state(job: Job) -> Dict[str, Any]:
+    return {
+        'id': str(job.pk),
+        'kind': job.kind,
+        'status': job.status,
+        'finished': job.is_finished,
+        'result': job.result if job.status == Job.DONE else None,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def notify(job: Job) -> None:
+    """Push the finished job's state to its callback_url (best effort)."""
+    request = urllib.request.Request(
+        job.payload['callback_url'], data=json.dumps(job_state(job)).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST',
+    )
+    try:
+        urllib.request.urlopen(request, timeout=5).close()
+    except OSError as e:
+        logger.warning('Callback for job %s failed: %s', job.pk, e)
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@register('qr_generate')
+def generate_qr(job: Job) -> Dict[str, Any]:
+    params = job.payload['params']
+    extension = qrcode_generator.FILE_EXTENSIONS[params['image_format']]
+    # The bytes are kept with the job and served from storage, so the web process never renders them.
+    name = default_storage.save(f'jobs/results/{job.pk}.{extension}',
+                                ContentFile(qrcode_generator.render_qr_code(**params)))
+    return {
+        'image': reverse('job_image', args=[job.pk]),
+        'file': name,
+        'file_name': f"qrcode_{qrcode_generator.qr_etag(**params)[:12]}",
+        'file_extension': extension,
+    }
+
+
+@register('qr_scan')
+def scan_qr(job: Job) -> Dict[str, Any]:
+    limits = job.payload.get('limits', {})
+    timeout = limits.get('timeout')
+    with job.upload.open('rb') as upload:
+        codes = qr_scan.scan_file(
+            upload, workers=limits.get('workers'), max_pixels=limits.get('max_pixels'),
+            max_frames=limits.get('max_frames'), deadline=time.monotonic() + timeout if timeout else None,
+        )
+    return {'codes': codes}
+
+
+def restore_profile_picture(job: Job) -> None:
+    """Put back the picture this upload was to replace, unless the placeholder has been replaced since."""
+    user = User.objects.filter(pk=job.payload['user_id']).first()
+    if user is None or user.pic.name != job.payload['placeholder']:
+        return
+    pending = Job.objects.filter(kind=job.kind, user=user, created_at__gt=job.created_at,
+                                 status__in=[Job.QUEUED, Job.RUNNING])
+    if pending.exists():
+        # A later upload owns the placeholder now; its job restores or replaces it.
+        return
+    user.pic = job.payload.get('previous') or ''
+    user.save(update_fields=['pic'])
+
+
+@register('profile_picture', on_failure=restore_profile_picture)
+def process_profile_picture(job: Job) -> Dict[str, Any]:
+    options = images.profile_picture_settings()
+    with job.upload.open('rb') as upload:
+        content = images.normalise(upload, options['max_side'], options['quality'], options['max_pixels'])
+    user = User.objects.get(pk=job.payload['user_id'])
+    newer = Job.objects.filter(kind=job.kind, user=user, created_at__gt=job.created_at).exists()
+    if newer or user.pic.name != job.payload['placeholder']:
+        # A later upload (or an admin edit) replaced the placeholder; this result is stale.
+        restore_profile_picture(job)
+        return {'skipped': True}
+    user.pic.save(f'{hashlib.sha256(content).hexdigest()[:20]}.jpg', ContentFile(content), save=False)
+    user.save(update_fields=['pic'])
+    return {'pic': user.pic.name, 'original_bytes': job.upload.size, 'bytes': len(content)}
@@ -0,0 +1,70 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.http import http_date
+from django.views.static import serve
+
+from softools.media import MediaServer
+
+
+def _consume(response):
+    """Bytes a client would receive; the file is read block by block like a WSGI server does."""
+    sent = sum(len(chunk) for chunk in response) if response.streaming else len(response.content)
+    response.close()
+    return sent
+
+
+class Command(BaseCommand):
+    help = "Compare Django's development static.serve with the media view on full, small, ranged and revalidated GETs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=16, help='Size of the large file.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp()
+        try:
+            self._run(root, options['size_mb'] * 1024 * 1024, options['repeat'])
+        finally:
+            shutil.rmtree(root)
+
+    def _run(self, root, size, repeat):
+        for name, length in (('large.bin', size), ('avatar.jpg', 20 * 1024)):
+            with open(os.path.join(root, name), 'wb') as f:
+                f.write(os.urandom(length))
+        media = MediaServer(root=root)
+        servers = {
+            'static.serve': lambda request, path: serve(request, path, document_root=root),
+            'media': media.serve,
+        }
+        factory = RequestFactory()
+        validators = media.serve(factory.get('/'), 'avatar.jpg')
+        modified = http_date(os.path.getmtime(os.path.join(root, 'avatar.jpg')))
+        scenarios = {
+            'large file': ('large.bin', {}),
+            'small file': ('avatar.jpg', {}),
+            '1 MB range': ('large.bin', {'HTTP_RANGE': f'bytes={size // 2}-{size // 2 + 1024 * 1024 - 1}'}),
+            'revalidate (IMS)': ('avatar.jpg', {'HTTP_IF_MODIFIED_SINCE': modified}),
+            'revalidate (INM)': ('avatar.jpg', {'HTTP_IF_NONE_MATCH': validators['ETag']}),
+        }
+
+        self.stdout.write(f"{'scenario':<18} " + ' '.join(f'{name:>32}' for name in servers))
+        for scenario, (path, headers) in scenarios.items():
+            cells = []
+            for view in servers.values():
+                timings = []
+                for _ in range(repeat):
+                    request = factory.get(f'/media/{path}', **headers)
+                    start = time.perf_counter()
+                    response = view(request, path)
+                    sent = _consume(response)
+                    timings.append(time.perf_counter() - start)
+                median = statistics.median(timings)
+                rate = f'{sent / median / 1024 / 1024:7.0f} MB/s' if sent >= 1024 * 1024 else f'{1 / median:7.0f} req/s'
+                cells.append(f'{response.status_code} {sent:>9d} B {median * 1000:7.2f} ms {rate}')
+            self.stdout.write(f'{scenario:<18} ' + ' '.join(f'{cell:>32}' for cell in cells))
@@ -0,0 +1,104 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from qrcode import QRCode
+from qrcode.constants import ERROR_CORRECT_L
+
+from scripts import qr_plan
+from scripts.qrcode_generator import ERROR_CORRECTION, data_encode
+
+# One representative payload per data_encode type (longer than the examples in qr_payloads).
+SAMPLES = {
+    'text': 'The quick brown fox jumps over the lazy dog',
+    'url': 'https://example.com/articles/2024/02/qr-code-planning?utm_source=softools',
+    'email': 'john@example.com',
+    'emailmessage': ('john@example.com', 'Team meeting', 'Weekly sync moved to 3pm'),
+    'telephone': '+1234567890',
+    'sms': ('+1234567890', 'Running late, be there in 10'),
+    'mms': ('+1234567890', 'Photos from the trip'),
+    'geo': ('40.7128', '-74.0060'),
+    'googlemap': ('40.7128', '-74.0060'),
+    'bookmark': ('SofTools', 'https://softools.example.com'),
+    'phonebook': [('N', 'Doe,John'), ('TEL', '+1234567890'), ('EMAIL', 'john@example.com')],
+    'vcard': [
+        ('FN', 'John Doe'), ('TEL', '+1234567890'), ('EMAIL', 'john@example.com'),
+        ('ORG', 'Company Name'), ('TITLE', 'Software Engineer'),
+    ],
+    'wifi': {'type': 'WPA', 'ssid': 'MyNetwork', 'password': 'MyPassword'},
+    'calendar': {
+        'summary': 'Team Meeting', 'start': '20240224T140000Z', 'end': '20240224T150000Z',
+        'location': 'Conference Room', 'description': 'Weekly team sync',
+    },
+    'bitcoin': {'address': '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa', 'amount': '0.001', 'label': 'Payment'},
+    'ethereum': {'address': '0xde0B295669a9FD93d5F28D9Ec85E40f4cb697BAe', 'value': '1e16'},
+    'twitter': 'softools',
+    'linkedin': 'john-doe',
+    'github': 'softools',
+    'playstore': 'com.example.softools',
+    'appstore': '1234567890',
+}
+
+
+def _fitted(payload):
+    # The previous code path: start at version 3 and let make() search for a fit.
+    qr = QRCode(version=3, error_correction=ERROR_CORRECT_L)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr
+
+
+def _planned(payload):
+    plan = qr_plan.plan_qr(payload)
+    qr = QRCode(version=plan.version, error_correction=ERROR_CORRECTION[plan.error_correction])
+    qr.add_data(qr_plan.segment(payload))
+    qr.make(fit=False)
+    return qr
+
+
+def _best_fit_only(payload):
+    qr = QRCode(version=3, error_correction=ERROR_CORRECT_L)
+    qr.add_data(payload)
+    qr.best_fit(start=qr.version)
+    return qr
+
+
+def _median_ms(func, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compare fixed version=3 + fit=True against the payload-shape planner for every data_encode type.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(
+            f"{'type':<13} {'bytes':>5} {'mode':<12} {'fit v':>5} {'plan':>5} "
+            f"{'fit ms':>8} {'plan ms':>8} {'search us':>9} {'cached us':>9}"
+        )
+        totals = [0.0, 0.0]
+        for kind, sample in SAMPLES.items():
+            payload = data_encode[kind](sample)
+            fitted = _fitted(payload)
+            qr_plan.plan_for_shape.cache_clear()
+            plan = qr_plan.plan_qr(payload)
+            fit_ms = _median_ms(_fitted, payload, repeat)
+            plan_ms = _median_ms(_planned, payload, repeat)
+            search_us = _median_ms(_best_fit_only, payload, repeat) * 1000
+            cached_us = _median_ms(qr_plan.plan_qr, payload, repeat) * 1000
+            totals[0] += fit_ms
+            totals[1] += plan_ms
+            self.stdout.write(
+                f'{kind:<13} {len(payload.encode()):>5} {plan.mode:<12} {fitted.version:>5} '
+                f'{f"{plan.version}{plan.error_correction}":>5} {fit_ms:>8.2f} {plan_ms:>8.2f} '
+                f'{search_us:>9.1f} {cached_us:>9.1f}'
+            )
+        self.stdout.write(f'total: fit {totals[0]:.1f} ms, planned {totals[1]:.1f} ms')
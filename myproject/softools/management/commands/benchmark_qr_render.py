@@ -0,0 +1,54 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from qrcode import QRCode
+from qrcode.constants import ERROR_CORRECT_L
+
+from scripts import qr_raster
+
+
+def _pil_png(qr, fill_color, back_color):
+    buffered = BytesIO()
+    qr.make_image(fill_color=fill_color, back_color=back_color).save(buffered, format='PNG')
+    return buffered.getvalue()
+
+
+def _numpy_png(qr, fill_color, back_color, palette=False):
+    modules = qr_raster.module_array(qr.get_matrix())
+    return qr_raster.encode_png(modules, qr.box_size, fill_color, back_color, palette=palette)
+
+
+class Command(BaseCommand):
+    help = 'Compare the PIL per-module PNG path with the NumPy rasteriser across QR versions and box sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--versions', type=int, nargs='+', default=[1, 5, 10, 20, 40])
+        parser.add_argument('--box-sizes', type=int, nargs='+', default=[1, 4, 10, 20])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--fill-color', default='#1e293b')
+        parser.add_argument('--back-color', default='white')
+
+    def handle(self, *args, **options):
+        fill, back = options['fill_color'], options['back_color']
+        renderers = {
+            'pil': lambda qr: _pil_png(qr, fill, back),
+            'numpy': lambda qr: _numpy_png(qr, fill, back),
+            'numpy-1bit': lambda qr: _numpy_png(qr, fill, back, palette=True),
+        }
+        self.stdout.write(f"{'version':>7} {'box':>4} " + ' '.join(f'{name:>22}' for name in renderers))
+        for version in options['versions']:
+            for box_size in options['box_sizes']:
+                qr = QRCode(version=version, error_correction=ERROR_CORRECT_L, box_size=box_size, border=4)
+                qr.add_data('x' * 10)
+                qr.make(fit=False)
+                cells = []
+                for render in renderers.values():
+                    timings = []
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        image = render(qr)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    cells.append(f'{statistics.median(timings):8.2f} ms {len(image):8d} B')
+                self.stdout.write(f'{version:>7} {box_size:>4} ' + ' '.join(f'{cell:>22}' for cell in cells))
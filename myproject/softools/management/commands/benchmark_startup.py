@@ -0,0 +1,61 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker process does before serving its first request.
+BOOT = (
+    'from django.core.wsgi import get_wsgi_application; get_wsgi_application(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+# Only the QR, scan and maths features may load these, on first use.
+HEAVY_MODULES = ('cv2', 'numpy', 'PIL', 'pyzbar', 'qrcode', 'sympy')
+
+
+def import_times(code=BOOT):
+    """{module: (self us, cumulative us, top level)} from a fresh `python -X importtime` run of code."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env=os.environ.copy(), check=False,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        # Only the outermost import of each module counts towards the total.
+        times.setdefault(name.strip(), (int(own), int(cumulative), not name.startswith('  ')))
+    return times
+
+
+class Command(BaseCommand):
+    help = 'Time a cold Django boot with -X importtime and fail if it is over budget or loads QR/maths libraries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=600, help='Maximum median boot import time.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list.')
+
+    def handle(self, *args, **options):
+        totals = []
+        for _ in range(options['repeat']):
+            times = import_times()
+            totals.append(sum(cumulative for _, cumulative, top in times.values() if top) / 1000)
+        self.stdout.write(f"{'module':<40} {'cumulative ms':>13}")
+        slowest = sorted(((c, n) for n, (_, c, top) in times.items() if top), reverse=True)[:options['top']]
+        for cumulative, name in slowest:
+            self.stdout.write(f'{name:<40} {cumulative / 1000:>13.1f}')
+        median = statistics.median(totals)
+        self.stdout.write(f"boot imports: median {median:.1f} ms over {len(totals)} runs "
+                          f"(budget {options['budget_ms']:.0f} ms), {len(times)} modules")
+
+        heavy = sorted(name for name in times if name.split('.')[0] in HEAVY_MODULES)
+        if heavy:
+            raise CommandError(f"Boot imports modules that should load on first use: {', '.join(heavy[:10])}")
+        if median > options['budget_ms']:
+            raise CommandError(f"Boot import time {median:.1f} ms is over the {options['budget_ms']:.0f} ms budget")
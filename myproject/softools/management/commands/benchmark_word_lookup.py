@@ -0,0 +1,67 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from softools.models import Alphabet, Word, search_key
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare exact-match latency of word__iexact against the indexed word_lower '
+        'column on a seeded throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            words = self._seed(options['rows'], options['batch_size'])
+            queries = [random.choice(words) for _ in range(options['lookups'])]
+            before = self._time(queries, lambda q: Word.objects.filter(word__iexact=q))
+            after = self._time(queries, lambda q: Word.objects.filter(word_lower=search_key(q)))
+            self._report('word__iexact', before)
+            self._report('word_lower', after)
+            self.stdout.write(f'speedup (p50): {statistics.median(before) / statistics.median(after):.1f}x')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _seed(self, rows, batch_size):
+        alphabets = {c: Alphabet.objects.create(character=c.upper()) for c in string.ascii_lowercase}
+        sample = []
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                word = ''.join(random.choices(string.ascii_lowercase, k=random.randint(4, 12))) + str(i)
+                batch.append(Word(
+                    word=word.capitalize(), word_lower=search_key(word), type='noun',
+                    description=f'Seeded entry {i}', id_alphabet=alphabets[word[0]],
+                ))
+            Word.objects.bulk_create(batch)
+            sample.extend(w.word for w in random.sample(batch, min(10, len(batch))))
+        self.stdout.write(f'seeded {rows} rows in {time.perf_counter() - start:.1f}s ({connection.vendor})')
+        return sample
+
+    def _time(self, queries, lookup):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            list(lookup(query.lower()).values('word', 'type', 'description'))
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        self.stdout.write(
+            f'{label:>13}: mean {statistics.mean(timings):8.3f} ms  '
+            f'p50 {statistics.median(timings):8.3f} ms  p99 {p99:8.3f} ms'
+        )
@@ -0,0 +1,24 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from softools.images import FIELD_PRESETS, build_for_instance, image_errors
+
+
+class Command(BaseCommand):
+    help = 'Backfill responsive image variants for existing Service images and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-encode variants that already exist.')
+
+    def handle(self, *args, **options):
+        for label in sorted({label for label, _ in FIELD_PRESETS}):
+            model = apps.get_model(label)
+            fields = [name for model_label, name in FIELD_PRESETS if model_label == label]
+            built = failed = 0
+            for instance in model.objects.exclude(**{name: '' for name in fields}).iterator():
+                try:
+                    built += build_for_instance(instance, force=options['force'])
+                except image_errors() as e:
+                    failed += 1
+                    self.stderr.write(f'{label} {instance.pk}: {e}')
+            self.stdout.write(f'{label}: {built} images processed, {failed} failed')
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from softools.browse import refresh_word_counts
+from softools.dictionary import search_cache
+from softools.models import Alphabet, Word, search_key
+
+FIELDS = ('word', 'type', 'description')
+
+
+def read_csv(stream: io.TextIOBase) -> Iterator[Dict[str, str]]:
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream: io.TextIOBase) -> Iterator[Dict[str, str]]:
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise CommandError(f'Line {line_number}: invalid JSON ({e})')
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def clean(records: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    for record in records:
+        word = (record.get('word') or '').strip()
+        if not word:
+            continue
+        yield {
+            'word': word,
+            'type': (record.get('type') or '').strip(),
+            'description': (record.get('description') or '').strip(),
+            'alphabet': (record.get('alphabet') or word[0]).strip().upper(),
+        }
+
+
+def batched(records: Iterable[Dict[str, str]], size: int) -> Iterator[List[Dict[str, str]]]:
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Stream words from CSV or JSONL files into the dictionary (columns: word, type, description[, alphabet]).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import; "-" reads stdin.')
+        parser.add_argument('--format', choices=READERS, help='Input format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update existing words (matched on word and type) instead of adding duplicates.')
+        parser.add_argument('--progress-every', type=int, default=50_000, help='Report progress every N rows.')
+
+    def handle(self, *args, **options):
+        self.alphabets = {a.character.upper(): a.pk for a in Alphabet.objects.all()}
+        self.batch_size = options['batch_size']
+        self.upsert = options['upsert']
+        self.progress_every = options['progress_every']
+        self.totals = {'created': 0, 'updated': 0}
+        self.start = time.perf_counter()
+        self.next_report = self.progress_every
+
+        try:
+            for path in options['paths']:
+                self._import(path, options['format'] or path.rsplit('.', 1)[-1].lower())
+        finally:
+            # bulk_create/bulk_update bypass the model signals. The recount and the new
+            # updated_at values change the dictionary validator, so the web workers rebuild
+            # their word indexes on their next recheck. Bumping the search cache generation
+            # retires cached results everywhere when DICTIONARY_CACHE['ALIAS'] is shared;
+            # without one, each worker's results expire after LOCAL_TTL.
+            refresh_word_counts()
+            search_cache.invalidate()
+
+        elapsed = time.perf_counter() - self.start
+        rows = self.totals['created'] + self.totals['updated']
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows} rows ({self.totals['created']} created, {self.totals['updated']} updated) "
+            f"in {elapsed:.1f}s, {rows / elapsed if elapsed else 0:,.0f} rows/s"
+        ))
+
+    def _import(self, path: str, fmt: str) -> None:
+        if fmt not in READERS:
+            raise CommandError(f'Cannot tell the format of "{path}", pass --format.')
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='') if path == '-' \
+            else open(path, newline='', encoding='utf-8')
+        with stream:
+            for batch in batched(clean(READERS[fmt](stream)), self.batch_size):
+                with transaction.atomic():
+                    created, updated = self._write(batch)
+                self.totals['created'] += created
+                self.totals['updated'] += updated
+                self._progress()
+
+    def _alphabet_id(self, character: str) -> int:
+        if character not in self.alphabets:
+            self.alphabets[character] = Alphabet.objects.create(character=character).pk
+        return self.alphabets[character]
+
+    def _write(self, batch: List[Dict[str, str]]) -> Tuple[int, int]:
+        existing: Dict[tuple, List[Word]] = {}
+        if self.upsert:
+            keys = {search_key(record['word']) for record in batch}
+            for word in Word.objects.filter(word_lower__in=keys).only('id', 'word', 'word_lower', 'type'):
+                existing.setdefault((word.word_lower, word.type), []).append(word)
+
+        now = timezone.now()
+        to_create, to_update, updated_pks = [], [], set()
+        for record in batch:
+            key = search_key(record['word'])
+            alphabet_id = self._alphabet_id(record['alphabet'])
+            matches = existing.get((key, record['type']))
+            if matches:
+                for word in matches:
+                    word.word, word.description, word.id_alphabet_id = record['word'], record['description'], alphabet_id
+                    word.word_lower, word.updated_at = key, now
+                    if word.pk and word.pk not in updated_pks:
+                        updated_pks.add(word.pk)
+                        to_update.append(word)
+                continue
+            word = Word(word_lower=key, id_alphabet_id=alphabet_id, **{f: record[f] for f in FIELDS})
+            to_create.append(word)
+            if self.upsert:
+                existing[key, record['type']] = [word]
+
+        if to_create:
+            Word.objects.bulk_create(to_create)
+        if to_update:
+            Word.objects.bulk_update(to_update, ['word', 'word_lower', 'description', 'id_alphabet', 'updated_at'])
+        return len(to_create), len(to_update)
+
+    def _progress(self) -> None:
+        rows = self.totals['created'] + self.totals['updated']
+        if self.progress_every and rows >= self.next_report:
+            elapsed = time.perf_counter() - self.start
+            self.stdout.write(f'{rows:,} rows, {rows / elapsed:,.0f} rows/s')
+            self.next_report = rows + self.progress_every
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from softools.fulltext import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dictionary full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild.')
+
+    def handle(self, *args, **options):
+        backend = get_backend(connections[options['database']])
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index using {type(backend).__name__}.'))
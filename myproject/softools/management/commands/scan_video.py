@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scripts import qr_video
+
+
+class Command(BaseCommand):
+    help = 'Scan a camera index, video file or stream URL headlessly and print each distinct code.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Camera index (e.g. 0), video file path or stream URL.')
+        parser.add_argument('--frame-skip', type=int, default=2, help='Frames skipped between decodes.')
+        parser.add_argument('--max-side', type=int, default=640, help='Longest side of the decoded frame.')
+        parser.add_argument('--queue-size', type=int, default=4)
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many distinct codes.')
+
+    def handle(self, *args, **options):
+        source = int(options['source']) if options['source'].isdigit() else options['source']
+        stats = qr_video.VideoScanStats()
+        codes = qr_video.scan_video(
+            source, frame_skip=options['frame_skip'], max_side=options['max_side'],
+            queue_size=options['queue_size'], stats=stats,
+        )
+        try:
+            for count, code in enumerate(codes, 1):
+                self.stdout.write(f"frame {code['frame']}: {code['data']}")
+                if count == options['limit']:
+                    break
+        except ValueError as e:
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            codes.close()
+        self.stdout.write(json.dumps(stats.summary(), indent=2))
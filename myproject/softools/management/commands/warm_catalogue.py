@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from softools.catalogue import service_catalogue
+
+
+class Command(BaseCommand):
+    help = 'Build the home page service catalogue and its rendered grids ahead of traffic.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true', help='Bump the version first, discarding cached copies.')
+
+    def handle(self, *args, **options):
+        if not service_catalogue.alias:
+            # Without a shared cache this process would warm only its own copy and exit.
+            raise CommandError("SERVICE_CATALOGUE['ALIAS'] must name a cache shared with the web workers.")
+        if options['refresh']:
+            service_catalogue.invalidate()
+        version = service_catalogue.warm()
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {len(service_catalogue.services(version))} services at version {version} "
+            f"(shared cache '{service_catalogue.alias}')."
+        ))
@@ -0,0 +1,78 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from softools import jobs
+
+
+def _init_process():
+    # Spawned children need Django set up; forked ones must not share the parent's connections.
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (QR rendering and scanning) until interrupted.'
+
+    def add_arguments(self, parser):
+        options = jobs.job_settings()
+        parser.add_argument('--concurrency', type=int, default=options['concurrency'],
+                            help='Jobs run in parallel, one process each; 1 runs them in this process.')
+        parser.add_argument('--poll-interval', type=float, default=options['poll_interval'],
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        settings = jobs.job_settings()
+        name = jobs.worker_name()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        self.stdout.write(f'Worker {name} running up to {concurrency} jobs at a time')
+
+        executor = None
+        if concurrency > 1:
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process)
+        running = set()
+        last_maintenance = 0.0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_maintenance > 60:
+                    jobs.requeue_stale(settings['lease'], settings['max_attempts'])
+                    jobs.purge_finished(settings['retention'])
+                    last_maintenance = time.monotonic()
+
+                claimed = jobs.claim(name, concurrency - len(running))
+                for pk in claimed:
+                    if executor is None:
+                        self.report(pk, jobs.run_job(pk))
+                    else:
+                        future = executor.submit(jobs.run_job, pk)
+                        future.pk = pk
+                        running.add(future)
+
+                if running:
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.report(future.pk, future.result())
+                elif not claimed:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                # Let running jobs finish; anything interrupted is requeued once its lease expires.
+                executor.shutdown(wait=True)
+
+    def report(self, pk, status):
+        self.stdout.write(f'{pk} {status}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
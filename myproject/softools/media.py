@@ -0,0 +1,189 @@
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseNotAllowed
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+# mimetypes only knows these on newer Pythons.
+CONTENT_TYPES = {'.avif': 'image/avif', '.webp': 'image/webp'}
+# Content-hashed names, written once and never changed: resized image variants and
+# processed profile pictures.
+IMMUTABLE = (r'^variants/[0-9a-f]{20}/', r'^profile_pics/[0-9a-f]{20}\.jpg$')
+# Worker inputs, the QR render cache and variant manifests are never served.
+PRIVATE = ('jobs/', 'qr_cache/', 'variants/manifests/')
+BYTE_RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+SENDFILE_HEADERS = {'x-sendfile': 'X-Sendfile', 'x-accel-redirect': 'X-Accel-Redirect'}
+
+
+class _FileRange:
+    """Reads at most length bytes of file from start; FileResponse streams it in blocks."""
+
+    def __init__(self, file: Any, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        data = self.file.read(self.remaining if size < 0 else min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class MediaServer:
+    """Serves uploaded media with validators, byte ranges and optional sendfile offload.
+
+    Every response carries a strong ETag (mtime and size) and Last-Modified,
+    so revalidation costs a stat() and no read. Single byte ranges get a 206
+    (If-Range is honoured); multiple ranges fall back to the whole file.
+    Content-hashed names are cached for a year as immutable, everything
+    else for MAX_AGE seconds.
+
+    With SENDFILE = 'x-sendfile' (Apache mod_xsendfile, lighttpd) or
+    'x-accel-redirect' (nginx) the body is left to the front-end server,
+    which also handles ranges. For nginx, ACCEL_PREFIX must map onto
+    MEDIA_ROOT through an internal location:
+
+        location /protected-media/ { internal; alias /srv/softools/media/; }
+    """
+
+    def __init__(self, root: Optional[str] = None, max_age: int = 3600, block_size: int = 256 * 1024,
+                 immutable: Sequence[str] = IMMUTABLE, private: Sequence[str] = PRIVATE,
+                 sendfile: Optional[str] = None, accel_prefix: str = '/protected-media/'):
+        if sendfile is not None and sendfile not in SENDFILE_HEADERS:
+            raise ValueError(f"MEDIA_SERVING['SENDFILE'] must be one of {sorted(SENDFILE_HEADERS)} or None")
+        self.root = root
+        self.max_age = max_age
+        self.block_size = block_size
+        self.immutable = re.compile('|'.join(immutable)) if immutable else None
+        self.private = tuple(private)
+        self.sendfile = sendfile
+        self.accel_prefix = accel_prefix.rstrip('/') + '/'
+
+    @classmethod
+    def from_settings(cls) -> 'MediaServer':
+        options = getattr(settings, 'MEDIA_SERVING', {})
+        return cls(
+            root=options.get('ROOT'),
+            max_age=options.get('MAX_AGE', 3600),
+            block_size=options.get('BLOCK_SIZE', 256 * 1024),
+            immutable=options.get('IMMUTABLE', IMMUTABLE),
+            private=options.get('PRIVATE', PRIVATE),
+            sendfile=options.get('SENDFILE'),
+            accel_prefix=options.get('ACCEL_PREFIX', '/protected-media/'),
+        )
+
+    def _locate(self, path: str) -> Tuple[str, os.stat_result]:
+        # MEDIA_ROOT is read per request so test overrides apply.
+        if path.startswith(self.private) or any(part.startswith('.') for part in path.split('/')):
+            raise Http404('Not found')
+        try:
+            fullpath = safe_join(self.root or settings.MEDIA_ROOT, path)
+            st = os.stat(fullpath)
+        except (SuspiciousFileOperation, OSError, ValueError):
+            raise Http404('Not found') from None
+        if not stat.S_ISREG(st.st_mode):
+            raise Http404('Not found')
+        return fullpath, st
+
+    def content_type(self, path: str) -> str:
+        content_type, encoding = mimetypes.guess_type(path)
+        if encoding:
+            # Served as stored; a Content-Encoding would make browsers unpack .gz files.
+            return 'application/octet-stream'
+        return content_type or CONTENT_TYPES.get(Path(path).suffix.lower(), 'application/octet-stream')
+
+    def byte_range(self, request: HttpRequest, size: int, etag: str, last_modified: int) -> Any:
+        """(start, end) for a satisfiable single range, False for an unsatisfiable one, else None."""
+        # Multiple ranges, malformed headers and stale If-Range all get the whole file.
+        match = BYTE_RANGE.fullmatch(request.META.get('HTTP_RANGE', '').strip())
+        if match is None or not any(match.groups()):
+            return None
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            return None
+        first, last = match.groups()
+        if not first:
+            length = int(last)
+            return (max(0, size - length), size - 1) if length and size else False
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        return (start, end) if start < size else False
+
+    def serve(self, request: HttpRequest, path: str) -> HttpResponse:
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        fullpath, st = self._locate(path)
+        last_modified = int(st.st_mtime)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self._body(request, path, fullpath, st.st_size, etag, last_modified)
+        if response.status_code in (200, 206, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            if self.immutable is not None and self.immutable.match(path):
+                patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+            else:
+                patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
+
+    def _body(self, request: HttpRequest, path: str, fullpath: str, size: int,
+              etag: str, last_modified: int) -> HttpResponse:
+        content_type = self.content_type(path)
+        if self.sendfile is not None:
+            response = HttpResponse(content_type=content_type)
+            target = fullpath if self.sendfile == 'x-sendfile' else quote(self.accel_prefix + path)
+            response[SENDFILE_HEADERS[self.sendfile]] = target
+            return response
+
+        byte_range = self.byte_range(request, size, etag, last_modified)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+        elif byte_range:
+            response = FileResponse(_FileRange(open(fullpath, 'rb'), start, length), content_type=content_type)
+        else:
+            response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        response.block_size = self.block_size
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+
+media_server = MediaServer.from_settings()
+
+
+def media_urlpatterns() -> List[Any]:
+    """The media route under MEDIA_URL; empty when media is on another host, as with static()."""
+    prefix = settings.MEDIA_URL
+    if not prefix or urlsplit(prefix).netloc:
+        return []
+    return [re_path(rf'^{re.escape(prefix.lstrip("/"))}(?P<path>.+)$', media_server.serve, name='media')]
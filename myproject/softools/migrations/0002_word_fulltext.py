@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than imported from softools.fulltext, so later
+# changes to the search backends cannot change what this migration does.
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS Word_fts USING fts5("
+    "word, description, content='Word', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS Word_fts_ai AFTER INSERT ON Word BEGIN "
+    "INSERT INTO Word_fts(rowid, word, description) VALUES (new.id, new.word, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS Word_fts_ad AFTER DELETE ON Word BEGIN "
+    "INSERT INTO Word_fts(Word_fts, rowid, word, description) VALUES ('delete', old.id, old.word, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS Word_fts_au AFTER UPDATE ON Word BEGIN "
+    "INSERT INTO Word_fts(Word_fts, rowid, word, description) VALUES ('delete', old.id, old.word, old.description); "
+    "INSERT INTO Word_fts(rowid, word, description) VALUES (new.id, new.word, new.description); END",
+    "INSERT INTO Word_fts(Word_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS Word_fts_ai",
+    "DROP TRIGGER IF EXISTS Word_fts_ad",
+    "DROP TRIGGER IF EXISTS Word_fts_au",
+    "DROP TABLE IF EXISTS Word_fts",
+]
+MYSQL_INSTALL = ["CREATE FULLTEXT INDEX Word_fulltext ON Word (word, description)"]
+MYSQL_UNINSTALL = ["DROP INDEX Word_fulltext ON Word"]
+
+
+def _execute(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_INSTALL)
+    elif vendor == 'mysql':
+        _execute(schema_editor, MYSQL_INSTALL)
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_UNINSTALL)
+    elif vendor == 'mysql':
+        _execute(schema_editor, MYSQL_UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softools', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softools', '0002_word_fulltext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
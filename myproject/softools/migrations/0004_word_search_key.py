@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+def populate_word_lower(apps, schema_editor):
+    Word = apps.get_model('softools', 'Word')
+    batch = []
+    for word in Word.objects.only('id', 'word').iterator(chunk_size=2000):
+        word.word_lower = word.word.strip().lower()[:255]
+        batch.append(word)
+        if len(batch) >= 2000:
+            Word.objects.bulk_update(batch, ['word_lower'])
+            batch = []
+    if batch:
+        Word.objects.bulk_update(batch, ['word_lower'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softools', '0003_word_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='word_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_word_lower, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['id_alphabet', 'word_lower'], name='word_alphabet_key_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 07:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_word_count(apps, schema_editor):
+    Alphabet = apps.get_model('softools', 'Alphabet')
+    Word = apps.get_model('softools', 'Word')
+    counts = Word.objects.values('id_alphabet').annotate(n=Count('pk')).values_list('id_alphabet', 'n')
+    for alphabet_id, n in counts:
+        Alphabet.objects.filter(pk=alphabet_id).update(word_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softools', '0004_word_search_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alphabet',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_word_count, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -12,6 +15,13 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so saves that keep the same picture (logins) skip the variant build.
+        instance._loaded_pictures = {'pic': instance.__dict__.get('pic') or ''}
+        return instance
+
     class Meta:
         # This is important to fix the app label issue
         app_label = 'softools'
@@ -23,6 +33,12 @@ class Service(models.Model):
     url = models.CharField(max_length=200, null=True, blank=True, default='#')
     github_url = models.URLField(max_length=500, null=True, blank=True, default='#')
     available = models.BooleanField(default=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_pictures = {'image': instance.__dict__.get('image') or ''}
+        return instance
     
     def __str__(self):
         return self.name
@@ -31,6 +47,7 @@ class Service(models.Model):
 
 class Alphabet(models.Model):
     character = models.TextField()
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     
     def __str__(self):
         return self.character
@@ -38,8 +55,17 @@ class Alphabet(models.Model):
     class Meta:
         db_table = 'Alphabet'
 
+SEARCH_KEY_LENGTH = 255
+
+
+def search_key(word: str) -> str:
+    """Normalised, indexable form of a word used for exact lookups."""
+    return word.strip().lower()[:SEARCH_KEY_LENGTH]
+
+
 class Word(models.Model):
     word = models.TextField()
+    word_lower = models.CharField(max_length=SEARCH_KEY_LENGTH, db_index=True, editable=False, default='')
     type = models.TextField()
     description = models.TextField()
     id_alphabet = models.ForeignKey(
@@ -47,11 +73,65 @@ class Word(models.Model):
         on_delete=models.CASCADE,
         db_column='ID_ALPHABET'
     ) 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     
     def __str__(self):
         return self.word
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so signals can move the per-letter count when it changes.
+        instance._loaded_alphabet_id = instance.__dict__.get('id_alphabet_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.word_lower = search_key(self.word)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'word' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'word_lower'}
+        super().save(*args, **kwargs)
     
     class Meta:
         db_table = 'Word'
-    
+        indexes = [
+            models.Index(fields=['id_alphabet', 'word_lower'], name='word_alphabet_key_idx'),
+        ]
+
+
+class Job(models.Model):
+    """A unit of background work (QR rendering or scanning) run by `manage.py worker`."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    upload = models.FileField(upload_to='jobs/%Y/%m/%d', null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.kind} {self.pk} ({self.status})'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: oldest queued (or stale running) jobs first.
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
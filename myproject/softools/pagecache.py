@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.safestring import mark_safe
+
+# Stands in for the navbar in a signed-in shell; swapped for the user's own per request.
+NAVBAR_SLOT = '<!--softools:navbar-->'
+
+
+class PageCache:
+    """Rendered public pages, one anonymous copy and one signed-in shell per path.
+
+    Anonymous requests are recognised by the missing session cookie, so a hit
+    never loads the session or the user. Entries live in the Django cache named
+    by PAGE_CACHE['ALIAS'] and are shared by every process. Pages that depend
+    on data pass a version callable (the service catalogue's, for the home
+    page), so a data change retires the cached copies without a purge.
+    """
+
+    def __init__(self, alias: str = 'default', timeout: Optional[int] = 600, max_age: int = 300):
+        self.alias = alias
+        self.timeout = timeout
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'not_modified'), 0)
+
+    @classmethod
+    def from_settings(cls) -> 'PageCache':
+        options = getattr(settings, 'PAGE_CACHE', {})
+        return cls(
+            alias=options.get('ALIAS', 'default'),
+            timeout=options.get('TIMEOUT', 600),
+            max_age=options.get('MAX_AGE', 300),
+        )
+
+    @property
+    def cache(self) -> Any:
+        return caches[self.alias]
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def key(self, request: HttpRequest, authenticated: bool, version: Any = '') -> str:
+        path = hashlib.md5(request.path.encode()).hexdigest()
+        return f"page:{version}:{path}:{'user' if authenticated else 'anon'}"
+
+    def page(self, version: Optional[Callable[[], Any]] = None, per_user: bool = True) -> Callable:
+        """Decorator for GET views returning a TemplateResponse that only varies on auth state.
+
+        per_user=False is for pages that look the same to everyone: all
+        requests get the anonymous copy and the user is never loaded.
+        """
+        def decorator(view: Callable) -> Callable:
+            @wraps(view)
+            def wrapped(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+                if request.method not in ('GET', 'HEAD'):
+                    return view(request, *args, **kwargs)
+                authenticated = (per_user and settings.SESSION_COOKIE_NAME in request.COOKIES
+                                 and request.user.is_authenticated)
+                key = self.key(request, authenticated, version() if version else '')
+                entry = self.cache.get(key)
+                if entry is None:
+                    self._count('misses')
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200 or getattr(response, 'context_data', None) is None:
+                        return response
+                    response.context_data['navbar'] = mark_safe(NAVBAR_SLOT if authenticated else '')
+                    content = response.render().content
+                    entry = {
+                        'content': content,
+                        'content_type': response['Content-Type'],
+                        'etag': f'"{hashlib.md5(content).hexdigest()}"',
+                    }
+                    self.cache.set(key, entry, self.timeout)
+                else:
+                    self._count('hits')
+                return self._respond(request, entry, authenticated)
+            return wrapped
+        return decorator
+
+    def _respond(self, request: HttpRequest, entry: Dict[str, Any], authenticated: bool) -> HttpResponse:
+        content, etag = entry['content'], entry['etag']
+        if authenticated:
+            navbar = render_to_string('navbar_user.html', {'user': request.user}, request)
+            content = content.replace(NAVBAR_SLOT.encode(), navbar.encode())
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+        conditional = get_conditional_response(request, etag=etag)
+        if conditional is not None:
+            self._count('not_modified')
+            response = conditional
+        else:
+            response = HttpResponse(content, content_type=entry['content_type'])
+        response['ETag'] = etag
+        if authenticated:
+            # Browsers may keep it but must revalidate; shared caches must not store it.
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=self.max_age)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+page_cache = PageCache.from_settings()
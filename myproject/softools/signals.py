@@ -0,0 +1,80 @@
+import logging
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .browse import adjust_word_count
+from .catalogue import service_catalogue
+from .dictionary import search_cache
+from .fulltext import get_backend
+from .fuzzy import prefix_index, word_index
+from .images import FIELD_PRESETS, build_for_instance, image_errors
+from .models import Alphabet, Service, User, Word
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Word)
+def index_word(sender, instance: Word, **kwargs) -> None:
+    word_index.add(instance.pk, instance.word)
+    prefix_index.add(instance.pk, instance.word)
+
+
+@receiver(post_delete, sender=Word)
+def unindex_word(sender, instance: Word, **kwargs) -> None:
+    word_index.remove(instance.pk)
+    prefix_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Word)
+def count_word(sender, instance: Word, created: bool, **kwargs) -> None:
+    previous = None if created else getattr(instance, '_loaded_alphabet_id', None)
+    if created or (previous is not None and previous != instance.id_alphabet_id):
+        adjust_word_count(previous, -1)
+        adjust_word_count(instance.id_alphabet_id, 1)
+    instance._loaded_alphabet_id = instance.id_alphabet_id
+
+
+@receiver(post_delete, sender=Word)
+def uncount_word(sender, instance: Word, **kwargs) -> None:
+    adjust_word_count(instance.id_alphabet_id, -1)
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+@receiver(post_save, sender=Alphabet)
+@receiver(post_delete, sender=Alphabet)
+def invalidate_search_cache(sender, **kwargs) -> None:
+    search_cache.invalidate()
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_catalogue(sender, **kwargs) -> None:
+    service_catalogue.invalidate()
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=User)
+def build_image_variants(sender, instance, raw: bool = False, update_fields=None, **kwargs) -> None:
+    fields = {name for label, name in FIELD_PRESETS if label == sender._meta.label}
+    if raw or (update_fields is not None and not fields & set(update_fields)):
+        # Logins save only last_login.
+        return
+    pictures = {name: getattr(instance, name).name or '' for name in fields}
+    if getattr(instance, '_loaded_pictures', None) == pictures:
+        return
+    instance._loaded_pictures = pictures
+    try:
+        build_for_instance(instance)
+    except image_errors() as e:
+        # Templates fall back to the original; the backfill command can retry.
+        logger.warning('Could not build image variants for %s: %s', instance, e)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using: str = 'default', **kwargs) -> None:
+    # SQLite rebuilds tables on ALTER, which silently drops the FTS triggers.
+    if sender.name == 'softools':
+        get_backend(connections[using]).install()
@@ -0,0 +1,38 @@
+from typing import Any
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import PRESETS, image_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(field_file: Any, preset: str, sizes: str = '100vw', **attrs: Any) -> str:
+    """<picture> with AVIF/WebP sources and a JPEG/PNG <img>, for an ImageField value.
+
+    Extra keyword arguments become <img> attributes, e.g. alt, class or loading.
+    Falls back to the original file when no variants can be made.
+    """
+    if not field_file:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    image = image_variants.sources(field_file, PRESETS[preset])
+    img_attrs = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    if image is None:
+        return format_html('<img src="{}" {}>', field_file.url, img_attrs)
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" {}></picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">',
+                         ((mime, srcset, sizes) for mime, srcset in image['sources'])),
+        image['src'], image['srcset'], sizes, image['width'], image['height'], img_attrs,
+    )
+
+
+@register.filter
+def srcset(field_file: Any, preset: str) -> str:
+    """The fallback-format srcset for an ImageField value, for hand-written <img> tags."""
+    image = image_variants.sources(field_file, PRESETS[preset]) if field_file else None
+    return image['srcset'] if image else ''
@@ -1,3 +1,966 @@
-from django.test import TestCase
+import difflib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+import cv2
+import numpy as np
+from PIL import Image
+from pyzbar import pyzbar
+from qrcode import QRCode
+
+from . import fulltext, images, jobs, media
+from .dictionary import SearchCache, search_cache, search_word
+from .fuzzy import FuzzyIndex, prefix_index, warm, word_index
+from .catalogue import ServiceCatalogue, service_catalogue
+from .images import image_variants
+from .models import Alphabet, Job, Service, User, Word, search_key
+from .pagecache import page_cache
+from .signals import uncount_word
+from scripts import qr_batch, qr_payloads, qr_plan, qr_raster, qr_scan, qr_video, qrcode_generator
+from scripts.qr_cache import RenderCache, render_cache
+
+
+class DictionarySearchQueryCountTests(TestCase):
+    """Each dictionary search must stay within two database round-trips."""
+
+    @classmethod
+    def setUpTestData(cls):
+        alphabet = Alphabet.objects.create(character='a')
+        for word, description in [
+            ('apple', 'A round fruit'),
+            ('apply', 'To make a formal request'),
+            ('banana', 'A long yellow fruit'),
+        ]:
+            Word.objects.create(word=word, type='noun', description=description, id_alphabet=alphabet)
+
+    def setUp(self):
+        search_cache.invalidate()
+        word_index.invalidate()
+        word_index.load()
+
+    def test_exact_match(self):
+        with self.assertNumQueries(1):
+            result = search_word('apple')
+        self.assertEqual(result['word'], [{'word': 'apple', 'type': 'noun', 'description': 'A round fruit'}])
+        self.assertEqual(result['queries'], 1)
+
+    def test_suggestion(self):
+        with self.assertNumQueries(2):
+            result = search_word('appel')
+        self.assertTrue(result['suggestion'])
+        self.assertEqual([row['word'] for row in result['word']], ['apply', 'apple'])
+
+    def test_warm_builds_both_indexes_with_one_query(self):
+        word_index.invalidate()
+        prefix_index.invalidate()
+        # The words, then the validator they are stamped with (latest change, word count).
+        with self.assertNumQueries(3):
+            warm()
+        with self.assertNumQueries(0):
+            self.assertEqual(prefix_index.complete('app'), ['apple', 'apply'])
+            self.assertEqual(word_index.get_close_matches('appel'), ['apply', 'apple'])
+
+    def test_changes_from_other_processes_rebuild_the_index(self):
+        # Patching the indexes out of the signals stands in for a write made by another worker.
+        with mock.patch('softools.signals.word_index'), mock.patch('softools.signals.prefix_index'):
+            Word.objects.get(word='apply').delete()
+            Word.objects.create(word='appeal', type='noun', description='A request', id_alphabet=Alphabet.objects.get())
+        self.assertIn('apply', word_index.get_close_matches('appel'))
+        with mock.patch.object(word_index, 'recheck', 0), mock.patch.object(prefix_index, 'recheck', 0):
+            self.assertEqual(sorted(word_index.get_close_matches('appel')), ['appeal', 'apple'])
+            self.assertEqual(prefix_index.complete('app'), ['appeal', 'apple'])
+
+    def test_vanished_suggestions_fall_through_to_full_text(self):
+        with mock.patch('softools.signals.word_index'):
+            Word.objects.filter(word__startswith='appl').delete()
+        search_cache.invalidate()
+        result = search_word('appel')
+        self.assertNotIn('suggestion', result)
+        self.assertEqual(result['error'], 'No matches found for "appel"')
+
+    def test_partial_match(self):
+        with self.assertNumQueries(2):
+            result = search_word('yellow')
+        self.assertTrue(result['partial_match'])
+        self.assertEqual([row['word'] for row in result['word']], ['banana'])
+
+    def test_no_match(self):
+        with self.assertNumQueries(2):
+            result = search_word('zzzzzz')
+        self.assertIn('error', result)
+        self.assertEqual(result['queries'], 2)
+
+
+class WordSearchKeyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        alphabet = Alphabet.objects.create(character='k')
+        cls.long_word = 'k' * 300
+        for word in (' Kiwi ', cls.long_word, cls.long_word + 'x'):
+            Word.objects.create(word=word, type='noun', description='d', id_alphabet=alphabet)
+
+    def setUp(self):
+        search_cache.invalidate()
+
+    def test_key_is_kept_in_sync(self):
+        word = Word.objects.get(word=' Kiwi ')
+        self.assertEqual(word.word_lower, 'kiwi')
+        word.word = 'KUMQUAT'
+        word.save()
+        self.assertEqual(Word.objects.filter(word_lower='kumquat').count(), 1)
+
+    def test_exact_lookup_uses_the_index(self):
+        self.assertIn('word_lower', Word.objects.filter(word_lower=search_key('KIWI')).explain())
+        self.assertEqual([row['word'] for row in search_word('kIwI')['word']], [' Kiwi '])
+
+    def test_truncated_keys_still_match_exactly(self):
+        self.assertEqual(Word.objects.filter(word_lower=search_key(self.long_word)).count(), 2)
+        result = search_word(self.long_word + 'X')
+        self.assertNotIn('suggestion', result)
+        self.assertEqual([row['word'] for row in result['word']], [self.long_word + 'x'])
+
+
+class FuzzyIndexTests(SimpleTestCase):
+    WORDS = ['apple', 'apply', 'ape', 'maple', 'applet', 'happy', 'papal', 'banana', 'bandana',
+             'cabana', 'a', 'ab', 'application', 'apple', 'Apple', 'lapel', 'pale', 'leap', 'plea']
+
+    def test_matches_difflib(self):
+        index = FuzzyIndex(loader=lambda: enumerate(self.WORDS))
+        for query in ('appel', 'aple', 'banan', 'a', 'pale', 'xyz', 'applications', 'pplea', ''):
+            for cutoff in (0.0, 0.4, 0.6, 0.8, 1.0):
+                for n in (1, 3, 10):
+                    self.assertEqual(
+                        index.get_close_matches(query, n=n, cutoff=cutoff),
+                        difflib.get_close_matches(query, self.WORDS, n=n, cutoff=cutoff),
+                        (query, n, cutoff),
+                    )
+
+    def test_add_and_remove(self):
+        index = FuzzyIndex(loader=lambda: enumerate(['apple', 'apple']))
+        index.load()
+        index.add(2, 'appel')
+        self.assertEqual(index.get_close_matches('appel', n=1), ['appel'])
+        index.remove(2)
+        index.remove(0)
+        self.assertEqual(index.get_close_matches('appel', n=5), ['apple'])
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        alphabet = Alphabet.objects.create(character='g')
+        Word.objects.create(word='grape', type='noun', description='A small fruit grown in bunches', id_alphabet=alphabet)
+        Word.objects.create(word='raisin', type='noun', description='A dried grape', id_alphabet=alphabet)
+        Word.objects.create(word='grapefruit', type='noun', description='A large citrus fruit', id_alphabet=alphabet)
+
+    def setUp(self):
+        search_cache.invalidate()
+
+    def words(self, rows):
+        return [row['word'] for row in rows]
+
+    def test_fts5_ranks_word_hits_before_description_hits(self):
+        backend = fulltext.get_backend(connection)
+        self.assertIsInstance(backend, fulltext.SQLiteFTS5Backend)
+        words = self.words(backend.search('grape'))
+        self.assertEqual(sorted(words[:2]), ['grape', 'grapefruit'])
+        self.assertEqual(words[2:], ['raisin'])
+        self.assertEqual(self.words(backend.search('citr')), ['grapefruit'])
+
+    def test_fts5_follows_word_changes(self):
+        backend = fulltext.SQLiteFTS5Backend(connection)
+        Word.objects.filter(word='raisin').update(description='A dried plum')
+        Word.objects.filter(word='grapefruit').delete()
+        self.assertEqual(self.words(backend.search('grape')), ['grape'])
+
+    def test_fallback_when_the_index_is_missing(self):
+        with mock.patch.object(fulltext.SQLiteFTS5Backend, 'table', 'Missing_fts'):
+            self.assertEqual(self.words(fulltext.SQLiteFTS5Backend(connection).search('citrus')), ['grapefruit'])
+
+    def test_like_backend_and_short_mysql_terms(self):
+        self.assertEqual(self.words(fulltext.SearchBackend(connection).search('grape')), ['grape', 'grapefruit', 'raisin'])
+        # Terms under InnoDB's minimum token size never reach MATCH ... AGAINST.
+        self.assertEqual(self.words(fulltext.MySQLFulltextBackend(connection).search('gr')), ['grape', 'grapefruit', 'raisin'])
+
+    def test_mysql_falls_back_without_its_index(self):
+        # SQLite has no MATCH ... AGAINST, which fails like a missing FULLTEXT index does.
+        self.assertEqual(self.words(fulltext.MySQLFulltextBackend(connection).search('citrus')), ['grapefruit'])
+
+    @override_settings(DICTIONARY_SEARCH_BACKEND='softools.fulltext.SearchBackend')
+    def test_search_word_uses_the_configured_backend(self):
+        result = search_word('bunches')
+        self.assertTrue(result['partial_match'])
+        self.assertEqual(self.words(result['word']), ['grape'])
+
+
+class ImportDictionaryTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_streams_batches_and_upserts(self):
+        csv_path = self.write('words.csv', 'word,type,description\nOlive,noun,A small fruit\norange,noun,Citrus\n ,noun,skipped\n')
+        jsonl_path = self.write('more.jsonl', '{"word": "onion", "type": "noun", "description": "A bulb"}\n\n'
+                                              '{"word": "olive", "type": "noun", "description": "An oily fruit"}\n')
+        prefix_index.load()
+        call_command('import_dictionary', csv_path, '--batch-size', '2', stdout=StringIO())
+        call_command('import_dictionary', jsonl_path, '--upsert', stdout=StringIO())
+
+        self.assertEqual(sorted(Word.objects.values_list('word', 'description')),
+                         [('olive', 'An oily fruit'), ('onion', 'A bulb'), ('orange', 'Citrus')])
+        self.assertEqual(Alphabet.objects.get(character='O').word_count, 3)
+        self.assertEqual(search_word('citrus')['word'][0]['word'], 'orange')
+        # No signals fire for bulk writes; the changed validator makes the index rebuild.
+        with mock.patch.object(prefix_index, 'recheck', 0):
+            self.assertEqual(prefix_index.complete('o'), ['olive', 'onion', 'orange'])
+
+    def test_invalid_json_is_reported(self):
+        path = self.write('bad.jsonl', '{"word": "ok", "type": "n", "description": "d"}\n{broken\n')
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            call_command('import_dictionary', path, stdout=StringIO())
+
+
+class DictionarySearchCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alphabet = Alphabet.objects.create(character='c')
+        Word.objects.create(word='cherry', type='noun', description='A small red fruit', id_alphabet=cls.alphabet)
+
+    def setUp(self):
+        search_cache.invalidate()
+
+    def test_repeated_query_is_served_from_cache(self):
+        search_word('Cherry ')
+        hits = search_cache.stats()['local_hits']
+        with self.assertNumQueries(0):
+            result = search_word('cherry')
+        self.assertEqual(result['word'][0]['word'], 'cherry')
+        self.assertEqual(search_cache.stats()['local_hits'], hits + 1)
+
+    def test_word_change_invalidates(self):
+        search_word('cherry')
+        Word.objects.filter(word='cherry').get().delete()
+        self.assertIn('error', search_word('cherry'))
+
+    @override_settings(DICTIONARY_CACHE={})
+    def test_process_local_entries_expire(self):
+        cache = SearchCache.from_settings()
+        self.assertEqual(cache.local_ttl, 30)
+        cache.set('cherry', {'word': []}, cache.generation())
+        self.assertIsNotNone(cache.get('cherry', cache.generation()))
+        with mock.patch('softools.dictionary.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertIsNone(cache.get('cherry', cache.generation()))
+
+
+class DictionaryAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        alphabet = Alphabet.objects.create(character='g')
+        for word in ('grape', 'grapefruit', 'guava'):
+            Word.objects.create(word=word, type='noun', description='A fruit', id_alphabet=alphabet)
+
+    def test_lookup_is_conditional(self):
+        response = self.client.get('/api/dictionary/', {'q': 'grape'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['word'], 'grape')
+        self.assertIn('max-age', response['Cache-Control'])
+        cached = self.client.get('/api/dictionary/', {'q': 'grape'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_validator_follows_the_database(self):
+        # A second worker without a shared alias never sees this process's invalidations.
+        other = SearchCache()
+        before = other.validator()
+        word = Word.objects.get(word='grape')
+        word.description = 'A small round fruit'
+        word.save()
+        edited = other.validator()
+        self.assertGreater(edited[0], before[0])
+        Word.objects.get(word='guava').delete()
+        self.assertEqual(other.validator()[1], edited[1] - 1)
+
+    def test_autocomplete(self):
+        response = self.client.get('/api/dictionary/autocomplete/', {'q': 'GRA'})
+        self.assertEqual(response.json()['results'], ['grape', 'grapefruit'])
+
+    def test_autocomplete_matches_its_etag(self):
+        url = '/api/dictionary/autocomplete/'
+        etag = self.client.get(url, {'q': 'gra'})['ETag']
+        # A delete in another worker: this process's index hears nothing.
+        with mock.patch('softools.signals.prefix_index'):
+            Word.objects.get(word='grapefruit').delete()
+        response = self.client.get(url, {'q': 'gra'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], ['grape'])
+
+
+class AlphabetBrowseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alphabet = Alphabet.objects.create(character='B')
+        for word in ('berry', 'Banana', 'bean', 'basil', 'beet'):
+            Word.objects.create(word=word, type='noun', description='', id_alphabet=cls.alphabet)
+
+    def test_count_is_maintained(self):
+        self.alphabet.refresh_from_db()
+        self.assertEqual(self.alphabet.word_count, 5)
+        Word.objects.get(word='beet').delete()
+        self.alphabet.refresh_from_db()
+        self.assertEqual(self.alphabet.word_count, 4)
+
+    def test_keyset_pages(self):
+        first = self.client.get('/api/dictionary/browse/b/', {'size': 2}).json()
+        self.assertEqual([w['word'] for w in first['words']], ['Banana', 'basil'])
+        second = self.client.get('/api/dictionary/browse/b/', {'size': 2, 'after': first['next']}).json()
+        self.assertEqual([w['word'] for w in second['words']], ['bean', 'beet'])
+
+    def test_both_cases_of_a_letter(self):
+        Alphabet.objects.create(character='b')
+        self.assertEqual(self.client.get('/api/dictionary/browse/b/').json()['letter'], 'B')
+        self.assertEqual(self.client.get('/api/dictionary/browse/q/').status_code, 404)
+
+    def test_count_never_goes_negative(self):
+        word = Word.objects.get(word='beet')
+        word.delete()
+        uncount_word(Word, word)
+        for other in Word.objects.all():
+            other.delete()
+        self.alphabet.refresh_from_db()
+        self.assertEqual(self.alphabet.word_count, 0)
+
+    def test_letter_index_does_not_count_words(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dictionary/browse/')
+        self.assertEqual(response.json()['letters'][0]['word_count'], 5)
+
+
+class ServiceCatalogueTests(TestCase):
+
+    def setUp(self):
+        service_catalogue.invalidate()
+        self.service = Service.objects.create(name='Dictionary', description='Look words up', available=True)
+
+    def test_anonymous_home_is_query_free(self):
+        service_catalogue.warm()
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertContains(response, 'Dictionary')
+        self.assertNotContains(response, 'Launch App')
+
+    def test_warm_command_needs_a_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, "SERVICE_CATALOGUE['ALIAS']"):
+            call_command('warm_catalogue', stdout=StringIO())
+        shared = ServiceCatalogue(alias='default')
+        with mock.patch('softools.management.commands.warm_catalogue.service_catalogue', shared):
+            call_command('warm_catalogue', stdout=StringIO())
+        # Another process sharing the alias sees the warmed version and entries.
+        other = ServiceCatalogue(alias='default')
+        self.assertEqual(other.version(), shared.version())
+        with self.assertNumQueries(0):
+            self.assertIn('Dictionary', other.grid(False))
+
+    def test_signals_and_admin_actions_bump_version(self):
+        self.client.get('/')
+        self.service.name = 'Word Finder'
+        self.service.save()
+        self.assertContains(self.client.get('/'), 'Word Finder')
+
+        admin = User.objects.create_superuser(username='admin', email='a@example.com', password='x')
+        self.client.force_login(admin)
+        self.assertContains(self.client.get('/'), 'Launch App')
+        self.client.post('/admin/softools/service/', {
+            'action': 'make_unavailable', '_selected_action': [self.service.pk],
+        })
+        self.assertNotContains(self.client.get('/'), 'Launch App')
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        service_catalogue.invalidate()
+        Service.objects.create(name='Dictionary', description='Look words up', available=True)
+
+    def test_anonymous_pages_are_cached_with_validators(self):
+        for path in ('/', '/about/', '/contact/', '/terms/'):
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                with self.assertNumQueries(0):
+                    second = self.client.get(path)
+                self.assertEqual(first.content, second.content)
+                self.assertIn('public', second['Cache-Control'])
+                self.assertIn('max-age=', second['Cache-Control'])
+                self.assertIn('Cookie', second['Vary'])
+                revalidated = self.client.get(path, HTTP_IF_NONE_MATCH=second['ETag'])
+                self.assertEqual(revalidated.status_code, 304)
+
+    def test_signed_in_users_share_the_shell_but_not_the_navbar(self):
+        for name in ('Ada', 'Grace'):
+            self.client.force_login(User.objects.create_user(
+                username=name.lower(), email=f'{name}@example.com', password='x', first_name=name,
+            ))
+            response = self.client.get('/')
+            self.assertContains(response, f'<span class="profile-name">{name}</span>', html=True)
+            self.assertContains(response, 'Launch App')
+            self.assertNotContains(response, 'hero-section')
+            self.assertIn('private', response['Cache-Control'])
+        self.assertGreaterEqual(page_cache.stats()['hits'], 1)
+        self.client.logout()
+        self.assertNotContains(self.client.get('/'), 'profile-name')
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        caches['default'].clear()
+        service_catalogue.invalidate()
+
+    def upload(self, name, size, mode='RGB'):
+        buffered = BytesIO()
+        exif = Image.Exif()
+        exif[0x0110] = 'Test Camera'
+        Image.new(mode, size, 'teal').save(buffered, format='JPEG' if mode == 'RGB' else 'PNG', exif=exif)
+        image_variants.forget(f'service_images/{name}')
+        return SimpleUploadedFile(name, buffered.getvalue())
+
+    def test_upload_builds_capped_variants(self):
+        service = Service.objects.create(name='Maps', description='x', image=self.upload('maps.jpg', (800, 450)))
+        manifest = image_variants.manifest(service.image)
+        self.assertEqual(manifest['widths'], [320, 480, 640, 800])
+        self.assertEqual(manifest['fallback'], 'jpeg')
+        storage = service.image.storage
+        for fmt in manifest['formats'] + ['jpeg']:
+            self.assertTrue(storage.exists(image_variants.variant_name(manifest, 480, fmt)))
+        with storage.open(image_variants.variant_name(manifest, 320, 'jpeg')) as f, Image.open(f) as variant:
+            self.assertEqual(variant.size, (320, 180))
+            self.assertFalse(variant.getexif())
+
+        html = self.client.get('/').content.decode()
+        self.assertRegex(html, r'<picture><source type="image/(avif|webp)"')
+        self.assertIn(f"/media/variants/{manifest['hash']}/800.jpg 800w", html)
+
+    def test_saves_that_keep_the_picture_skip_the_build(self):
+        User.objects.create_user(username='pictured', email='p@example.com', password='x')
+        with mock.patch('softools.signals.build_for_instance') as build:
+            self.client.login(username='pictured', password='x')
+            user = User.objects.get(username='pictured')
+            user.first_name = 'Pat'
+            user.save()
+            build.assert_not_called()
+            user.pic = self.upload('pat.jpg', (200, 200))
+            user.save()
+            build.assert_called_once()
+
+    def test_decompression_bombs_are_not_server_errors(self):
+        with mock.patch('PIL.Image.MAX_IMAGE_PIXELS', 1000), self.assertLogs('softools.signals', 'WARNING'):
+            Service.objects.create(name='Bomb', description='x', image=self.upload('bomb.jpg', (800, 450)))
+            response = self.client.get('/')
+        self.assertContains(response, 'Bomb')
+
+    def test_transparent_images_fall_back_to_png_and_backfill(self):
+        service = Service.objects.create(name='Logo', description='x')
+        Service.objects.filter(pk=service.pk).update(image=service.image.storage.save(
+            'service_images/logo.png', self.upload('logo.png', (200, 200), mode='RGBA'),
+        ))
+        call_command('build_image_variants', stdout=StringIO())
+        service.refresh_from_db()
+        manifest = image_variants.manifest(service.image)
+        self.assertEqual((manifest['fallback'], manifest['widths']), ('png', [200]))
+
+
+class MediaServingTests(SimpleTestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        for name, content in (('service_images/maps.jpg', b'0123456789'),
+                              ('variants/0123456789abcdef0123/320.avif', b'avif'),
+                              ('jobs/2024/01/01/scan.png', b'private')):
+            path = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+
+    def test_validators_and_cache_lifetimes(self):
+        response = self.client.get('/media/service_images/maps.jpg')
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual((response['Content-Type'], response['Content-Length']), ('image/jpeg', '10'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(self.client.get('/media/service_images/maps.jpg',
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/media/service_images/maps.jpg',
+                                         HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        response = self.client.get('/media/variants/0123456789abcdef0123/320.avif')
+        self.assertEqual(response['Content-Type'], 'image/avif')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_byte_ranges(self):
+        url = '/media/service_images/maps.jpg'
+        response = self.client.get(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 2-5/10'))
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE='bytes=-3').streaming_content), b'789')
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE='bytes=7-99').streaming_content), b'789')
+        response = self.client.get(url, HTTP_RANGE='bytes=10-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */10'))
+        # Multiple ranges and a stale If-Range get the whole file.
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-1,4-5').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_private_and_missing_paths_are_not_found(self):
+        for path in ('jobs/2024/01/01/scan.png', '../settings.py', 'service_images', 'missing.jpg'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f'/media/{path}').status_code, 404)
+
+    def test_sendfile_offload(self):
+        request = RequestFactory().get('/media/service_images/maps.jpg')
+        response = media.MediaServer(sendfile='x-accel-redirect').serve(request, 'service_images/maps.jpg')
+        self.assertEqual((response.content, response['X-Accel-Redirect']),
+                         (b'', '/protected-media/service_images/maps.jpg'))
+        response = media.MediaServer(sendfile='x-sendfile').serve(request, 'service_images/maps.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'service_images/maps.jpg'))
+        self.assertIn('ETag', response)
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class QRCodeImageTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='render', email='r@example.com', password='x'))
+
+    def test_output_formats(self):
+        sizes = {}
+        for image_format, content_type in (
+            ('png', 'image/png'), ('png1', 'image/png'), ('svg', 'image/svg+xml'), ('webp', 'image/webp'),
+        ):
+            response = self.client.get('/qrcode/image/', {
+                'data': 'softools', 'format': image_format, 'fill_color': '#1e293b',
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], content_type)
+            self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+            sizes[image_format] = len(response.content)
+        self.assertLess(sizes['png1'], sizes['png'])
+        self.assertLess(sizes['webp'], sizes['png'])
+
+    def test_render_version_changes_validators(self):
+        etag = qrcode_generator.qr_etag('softools')
+        with mock.patch.object(qrcode_generator, 'QR_RENDER_VERSION', qrcode_generator.QR_RENDER_VERSION + 1):
+            self.assertNotEqual(qrcode_generator.qr_etag('softools'), etag)
+        self.assertEqual(self.client.get('/qrcode/image/', {'data': 'softools'})['ETag'], f'"{etag}"')
+
+    def test_size_and_border(self):
+        response = self.client.get('/qrcode/image/', {'data': 'softools', 'format': 'svg', 'size': 2, 'border': 0})
+        self.assertIn(b'width="42"', response.content)
+        self.assertEqual(self.client.get('/qrcode/image/', {'data': 'softools', 'size': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/qrcode/image/', {'data': 'x' * 2000, 'size': 40}).status_code, 400)
+
+    def test_disk_tier_is_bounded_across_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        first, second = (RenderCache(directory=directory, max_bytes=3000, rescan_every=1) for _ in range(2))
+        for index in range(10):
+            (first if index % 2 else second).get_or_render(f'{index:064x}', lambda: b'x' * 1000)
+        self.assertLessEqual(sum(path.stat().st_size for path in Path(directory).glob('*/*')), 3000)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get('/qrcode/image/', {'data': 'softools'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('/login/'))
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class QRBatchTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='batch', email='b@example.com', password='x'))
+
+    def post(self, **body):
+        response = self.client.post('/qrcode/batch/', json.dumps(body), content_type='application/json')
+        return response, b''.join(response.streaming_content)
+
+    def test_zip_and_pdf_responses(self):
+        items = ['first', {'type': 'url', 'data': 'https://example.com', 'name': 'site'}, {'type': 'geo', 'data': [91, 0]}]
+        response, content = self.post(items=items, output='zip')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertEqual(archive.namelist(), ['qrcode_00001.png', 'site.png', 'errors.txt'])
+            self.assertIn('qrcode_00003.txt: ValueError', archive.read('errors.txt').decode())
+            with Image.open(BytesIO(archive.read('site.png'))) as image:
+                self.assertEqual(image.format, 'PNG')
+
+        response, content = self.post(items=items[:2], output='pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="qrcodes.pdf"')
+        self.assertTrue(content.startswith(b'%PDF-1.4') and content.endswith(b'%%EOF\n'))
+        self.assertEqual(content.count(b'/Type /Page '), 2)
+
+    def test_pool_is_shared_and_survives_abandoned_batches(self):
+        pool = qr_batch.BatchPool(workers=2)
+        self.addCleanup(pool.configure, 2)
+        items = [f'code {index}' for index in range(64)]
+        stream = qr_batch.render_batch(items, {}, pool, chunksize=1)
+        next(stream)
+        executor = pool._executor
+        # A client disconnecting closes the stream; queued chunks are cancelled, not awaited.
+        stream.close()
+        names = [name for name, _, _ in qr_batch.render_batch(items[:8], {}, pool)]
+        self.assertEqual(names, [f'qrcode_{index:05d}.png' for index in range(1, 9)])
+        self.assertIs(pool._executor, executor)
+
+
+class QRPlanTests(SimpleTestCase):
+
+    def test_mode_and_version(self):
+        self.assertEqual(qr_plan.plan_qr('1' * 41), qr_plan.QRPlan(1, 'L', 'numeric'))
+        self.assertEqual(qr_plan.plan_qr('1' * 42).version, 2)
+        self.assertEqual(qr_plan.plan_qr('HELLO WORLD').mode, 'alphanumeric')
+        self.assertEqual(qr_plan.plan_qr('hello world').mode, 'byte')
+
+    def test_constants_match_qrcode(self):
+        from qrcode import constants, util
+        self.assertEqual(qr_plan.LEVEL_CONSTANTS, {
+            'L': constants.ERROR_CORRECT_L, 'M': constants.ERROR_CORRECT_M,
+            'Q': constants.ERROR_CORRECT_Q, 'H': constants.ERROR_CORRECT_H,
+        })
+        self.assertEqual((qr_plan.MODE_NUMBER, qr_plan.MODE_ALPHA_NUM, qr_plan.MODE_8BIT_BYTE),
+                         (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE))
+
+    def test_matches_best_fit(self):
+        for length in (1, 17, 18, 100, 500, 1500, 2953):
+            payload = 'x' * length
+            qr = QRCode(error_correction=qr_plan.LEVEL_CONSTANTS['L'])
+            qr.add_data(qr_plan.segment(payload))
+            self.assertEqual(qr_plan.plan_qr(payload, boost=False).version, qr.best_fit())
+
+    def test_error_correction_is_boosted_within_version(self):
+        self.assertEqual(qr_plan.plan_qr('softools'), qr_plan.QRPlan(1, 'Q', 'byte'))
+        self.assertEqual(qr_plan.plan_qr('softools', 'H').version, 2)
+
+    def test_overflow(self):
+        with self.assertRaises(ValueError):
+            qr_plan.plan_qr('x' * 2953, 'H')
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class QRRasterTests(SimpleTestCase):
+
+    def pixels(self, png):
+        return np.asarray(Image.open(BytesIO(png)).convert('RGB'))
+
+    def test_matches_pil_rendering(self):
+        for box_size, border in ((1, 0), (3, 4), (10, 2)):
+            qr = QRCode(box_size=box_size, border=border)
+            qr.add_data('https://example.com/softools')
+            modules = qr_raster.module_array(qr.get_matrix())
+            for fill, back in (('black', 'white'), ('#1e293b', '#fef3c7')):
+                expected = np.asarray(qr.make_image(fill_color=fill, back_color=back).convert('RGB'))
+                for palette in (False, True):
+                    png = qr_raster.encode_png(modules, box_size, fill, back, palette=palette)
+                    np.testing.assert_array_equal(self.pixels(png), expected)
+                    # IHDR bit depth: 1 for the palette mode, 8 for RGB.
+                    self.assertEqual(png[24], 1 if palette else 8)
+
+
+class StartupImportTests(SimpleTestCase):
+
+    def test_boot_does_not_load_qr_libraries(self):
+        # The budget is loose so slow CI machines pass; the module check is the real guard.
+        call_command('benchmark_startup', repeat=1, budget_ms=5000, stdout=StringIO())
+
+
+class QRPayloadTests(TestCase):
+    encode = staticmethod(qr_payloads.data_encode.encode)
+
+    def test_escaping(self):
+        self.assertEqual(
+            self.encode('wifi', {'ssid': 'Cafe; "Free", 2:00', 'password': 'a\\b'}),
+            'WIFI:T:WPA;S:Cafe\\; \\"Free\\"\\, 2\\:00;P:a\\\\b;;',
+        )
+        self.assertEqual(
+            self.encode('phonebook', [('N', 'Doe,John'), ('TEL', '+1234567890')]),
+            'MECARD:N:Doe\\,John;TEL:+1234567890;;',
+        )
+
+    def test_values_are_encoded_as_given(self):
+        self.assertEqual(self.encode('text', '  indented\n'), '  indented\n')
+        self.assertEqual(self.encode('wifi', {'ssid': 'Home', 'password': ' secret '}), 'WIFI:T:WPA;S:Home;P: secret ;;')
+        with self.assertRaises(ValueError):
+            self.encode('text', '   ')
+
+    def test_vcard_has_no_blank_lines(self):
+        vcard = self.encode('vcard', [('FN', 'John Doe'), ('NOTE', 'two\nlines')])
+        self.assertEqual(vcard.split('\n'), ['BEGIN:VCARD', 'VERSION:3.0', 'FN:John Doe', 'NOTE:two\\nlines', 'END:VCARD'])
+
+    def test_validation(self):
+        for kind, data in (
+            ('geo', (91, 0)), ('email', 'not-an-address'), ('ethereum', {'address': '0x12'}),
+            ('wifi', {'ssid': 'Home', 'type': 'WPA'}), ('calendar', {'summary': 'x', 'start': 'soon', 'end': 'later'}),
+            ('vcard', 'FN:John'), ('unknown', 'x'),
+        ):
+            with self.subTest(kind=kind), self.assertRaises(ValueError):
+                self.encode(kind, data)
+        self.assertEqual(self.encode('bitcoin', {'address': '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa'}),
+                         'bitcoin:1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa')
+
+    def test_examples_encode(self):
+        for kind in qr_payloads.data_encode:
+            with self.subTest(kind=kind):
+                self.assertTrue(self.encode(kind, qr_payloads.data_encode.encoder(kind).example))
+
+    @mock.patch.object(render_cache, 'directory', None)
+    def test_qrcode_app_encodes_structured_type(self):
+        self.client.force_login(User.objects.create_user(username='encoder', email='e@example.com', password='x'))
+        response = self.client.post('/qrcode/', {'type': 'geo', 'data': '[51.5, -0.12]'})
+        self.assertIn('data=geo%3A51.5%2C-0.12', response['Location'])
+
+
+# Version 2 payloads: some zbar builds misread the smallest, high-EC version 1 symbols.
+SCAN_PAYLOADS = ('https://example.com/scan/first', 'https://example.com/scan/second')
+
+
+class ScanFixtureMixin:
+
+    def code(self, data, box_size, image_format='png'):
+        """Render a fixture and check zbar reads it on its own, before any pipeline sees it."""
+        image = Image.open(BytesIO(qrcode_generator.render_qr_code(data, image_format=image_format, box_size=box_size)))
+        decoded = [code.data.decode() for code in pyzbar.decode(image.convert('L'))]
+        self.assertEqual(decoded, [data], f'zbar cannot read the {data!r} fixture on its own; choose another payload')
+        return image
+
+
+class QRScanTests(ScanFixtureMixin, SimpleTestCase):
+
+    def upload(self, image, image_format, **kwargs):
+        buffered = BytesIO()
+        image.save(buffered, format=image_format, **kwargs)
+        buffered.seek(0)
+        return buffered
+
+    def test_small_codes_in_large_photo(self):
+        photo = Image.new('L', (3200, 2400), 255)
+        positions = dict(zip(SCAN_PAYLOADS, [(200, 150), (2600, 1900)]))
+        for data, position in positions.items():
+            photo.paste(self.code(data, 3, 'png1'), position)
+        codes = qr_scan.scan_file(self.upload(photo, 'JPEG', quality=90))
+        self.assertEqual(sorted(code['data'] for code in codes), list(SCAN_PAYLOADS))
+        for code in codes:
+            left, top = positions[code['data']]
+            self.assertTrue(all(left <= x <= left + 150 and top <= y <= top + 150 for x, y in code['polygon']))
+
+    def test_every_frame_is_scanned(self):
+        frames = [self.code(data, 6, 'png1').convert('RGB') for data in SCAN_PAYLOADS]
+        upload = self.upload(frames[0], 'TIFF', save_all=True, append_images=frames[1:])
+        codes = qrcode_generator.scan_from_file(upload)
+        self.assertEqual([(code['data'], code['frame']) for code in codes], list(zip(SCAN_PAYLOADS, (0, 1))))
+
+    def test_unreadable_upload(self):
+        with self.assertRaises(ValueError):
+            qr_scan.scan_file(BytesIO(b'not an image'))
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class QRScanLimitTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='scanner', email='s@example.com', password='x'))
+
+    def scan(self, content, name='scan.png'):
+        response = self.client.post('/qrcode/', {'qrscan': SimpleUploadedFile(name, content)}, follow=True)
+        return response.context['file_scan_data'], response.context.get('scan_results')
+
+    def test_scan_runs_on_pool(self):
+        message, results = self.scan(qrcode_generator.render_qr_code('pooled', image_format='png1'))
+        self.assertIsNone(message)
+        self.assertEqual([code['data'] for code in results], ['pooled'])
+
+    @override_settings(QR_SCAN={'MAX_BYTES': 1024})
+    def test_oversized_upload_is_dropped(self):
+        message, _ = self.scan(b'x' * 4096)
+        self.assertIn('limited to 1024 bytes', message)
+
+    @override_settings(QR_SCAN={'MAX_PIXELS': 10_000})
+    def test_pixel_limit_uses_header(self):
+        buffered = BytesIO()
+        Image.new('L', (200, 200), 255).save(buffered, format='PNG')
+        with mock.patch.object(Image.Image, 'load', side_effect=AssertionError('decoded pixels')):
+            message, _ = self.scan(buffered.getvalue())
+        self.assertIn('the limit is 10000 pixels', message)
+
+    def test_large_jpeg_is_drafted(self):
+        buffered = BytesIO()
+        Image.new('L', (400, 400), 255).save(buffered, format='JPEG')
+        frame = next(qr_scan.iter_frames(BytesIO(buffered.getvalue()), max_pixels=20_000))
+        self.assertEqual(frame.size, (100, 100))
+
+    def test_busy_pool_refuses(self):
+        pool = qr_scan.ScanPool(concurrency=1, backlog=0)
+        with mock.patch.object(qr_scan, 'scan_file', side_effect=lambda *a, **k: time.sleep(0.3)):
+            with self.assertRaisesMessage(ValueError, 'longer than 0.05 seconds'):
+                pool.scan(BytesIO(), timeout=0.05)
+            with self.assertRaisesMessage(ValueError, 'Too many scans'):
+                pool.scan(BytesIO(), timeout=0.05)
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_login(User.objects.create_user(username='queued', email='q@example.com', password='x'))
+
+    def run_worker(self):
+        call_command('worker', burst=True, concurrency=1, stdout=StringIO())
+
+    def test_async_generation(self):
+        response = self.client.post('/qrcode/', {'data': 'later', 'format': 'svg', 'async': '1'})
+        job = Job.objects.get()
+        self.assertRedirects(response, f'/qrcode/?job={job.pk}')
+        pending = self.client.get(f'/jobs/{job.pk}/')
+        self.assertEqual((pending.json()['status'], pending['Retry-After']), ('queued', '1'))
+
+        self.run_worker()
+        state = self.client.get(f'/jobs/{job.pk}/').json()
+        self.assertEqual(state['status'], 'done')
+        page = self.client.get(f'/qrcode/?job={job.pk}')
+        self.assertEqual(page.context['qr_image'], state['result']['image'])
+
+        # The worker's bytes are served as stored; nothing is rendered in the web process.
+        with mock.patch.object(qrcode_generator, 'render_qr_code') as render:
+            image = self.client.get(state['result']['image'])
+        render.assert_not_called()
+        self.assertEqual(image['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', b''.join(image.streaming_content))
+        self.assertIn('private', image['Cache-Control'])
+
+        Job.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        jobs.purge_finished(retention=60)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, state['result']['file'])))
+
+    def test_async_scan(self):
+        upload = SimpleUploadedFile('code.png', qrcode_generator.render_qr_code('queued scan', image_format='png1'))
+        self.client.post('/qrcode/', {'qrscan': upload, 'async': '1'})
+        job = Job.objects.get()
+        self.assertEqual(job.kind, 'qr_scan')
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual([code['data'] for code in job.result['codes']], ['queued scan'])
+        self.assertFalse(job.upload)
+
+    def test_profile_picture_is_processed_by_worker(self):
+        buffered = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees: the worker must stand it upright.
+        photo = Image.effect_noise((750, 500), 64).resize((3000, 2000), Image.Resampling.BICUBIC).convert('RGB')
+        photo.save(buffered, format='JPEG', quality=95, exif=exif)
+        user = User.objects.get(username='queued')
+        self.client.post('/profile/', {
+            'username': 'queued', 'email': 'q@example.com', 'first_name': 'Q', 'last_name': 'Ueued',
+            'age': '', 'gender': 'Unknown', 'pic': SimpleUploadedFile('phone.jpg', buffered.getvalue()),
+        })
+        user.refresh_from_db()
+        self.assertEqual(user.pic.name, images.PLACEHOLDER_NAME)
+        self.assertEqual(Job.objects.get().kind, 'profile_picture')
+
+        self.run_worker()
+        user.refresh_from_db()
+        with user.pic.open('rb') as f, Image.open(f) as picture:
+            self.assertEqual((picture.format, picture.size), ('JPEG', (683, 1024)))
+            self.assertFalse(picture.getexif())
+        self.assertLess(user.pic.size, len(buffered.getvalue()) / 4)
+
+    def test_failed_profile_picture_restores_previous(self):
+        user = User.objects.get(username='queued')
+        buffered = BytesIO()
+        Image.new('RGB', (64, 64), 'teal').save(buffered, format='JPEG')
+        user.pic.save('old.jpg', ContentFile(buffered.getvalue()))
+        previous = user.pic.name
+        form = {'username': 'queued', 'email': 'q@example.com', 'first_name': 'Q', 'last_name': 'Ueued',
+                'age': '', 'gender': 'Unknown'}
+        for name in ('first.jpg', 'second.jpg'):
+            self.client.post('/profile/', dict(form, pic=SimpleUploadedFile(name, buffered.getvalue())))
+        self.assertEqual(Job.objects.filter(payload__previous=previous).count(), 2)
+
+        with mock.patch.object(images, 'normalise', side_effect=OSError('truncated upload')), \
+                self.assertLogs('softools.jobs', 'ERROR'):
+            self.run_worker()
+        user.refresh_from_db()
+        self.assertEqual(user.pic.name, previous)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.FAILED})
+        self.assertFalse(any(job.upload for job in Job.objects.all()))
+
+    def test_profile_rejects_non_images(self):
+        self.client.post('/profile/', {
+            'username': 'queued', 'email': 'q@example.com', 'first_name': 'Q', 'last_name': 'Ueued',
+            'age': '', 'gender': 'Unknown', 'pic': SimpleUploadedFile('notes.jpg', b'not an image'),
+        })
+        self.assertFalse(User.objects.get(username='queued').pic)
+        self.assertFalse(Job.objects.exists())
+
+    def test_jobs_are_private(self):
+        job = jobs.submit('qr_generate', {'params': {}, 'image': ''})
+        self.assertEqual(self.client.get(f'/jobs/{job.pk}/').status_code, 404)
+
+    def test_claim_is_exclusive(self):
+        job = jobs.submit('qr_generate', {'params': {}, 'image': ''})
+        self.assertEqual(jobs.claim('a', 5), [job.pk])
+        self.assertEqual(jobs.claim('b', 5), [])
+
+
+@mock.patch.object(render_cache, 'directory', None)
+class VideoScanTests(ScanFixtureMixin, SimpleTestCase):
+
+    def test_distinct_codes_from_video_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/codes.avi'
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (640, 480))
+        codes = [np.asarray(self.code(data, 8).convert('RGB')) for data in SCAN_PAYLOADS]
+        for index in range(24):
+            frame = np.full((480, 640, 3), 255, dtype=np.uint8)
+            code = codes[index // 12]
+            frame[40:40 + code.shape[0], 100:100 + code.shape[1]] = code
+            writer.write(frame)
+        writer.release()
+
+        stats = qr_video.VideoScanStats()
+        codes = list(qrcode_generator.scan_from_camera(path, headless=True, frame_skip=1, max_side=320, stats=stats))
+        self.assertEqual([code['data'] for code in codes], list(SCAN_PAYLOADS))
+        summary = stats.summary()
+        self.assertEqual((summary['frames_read'], summary['frames_decoded']), (24, 12))
+        self.assertIsNotNone(summary['latency_ms_mean'])
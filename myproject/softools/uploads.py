@@ -0,0 +1,30 @@
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Drop any uploaded file as soon as it grows past max_bytes.
+
+    Installed ahead of Django's memory and temporary-file handlers, so the rest
+    of an oversized file is read and discarded chunk by chunk instead of being
+    spooled. Names of dropped fields are listed in request.oversized_files.
+    """
+
+    def __init__(self, request=None, max_bytes=5 * 1024 * 1024):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+        request.oversized_files = []
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.request.oversized_files.append(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
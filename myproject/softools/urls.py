@@ -1,7 +1,6 @@
 from django.urls import path
 from . import views
-from django.conf import settings
-from django.conf.urls.static import static
+from .media import media_urlpatterns
 
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
@@ -14,7 +13,18 @@ urlpatterns = [
     path('delete_account/', views.delete_account, name='delete_account'),
     path('settings/', views.settings_view, name='settings'),
     path('qrcode/', views.qrcode_app, name='qrcode'),
+    path('qrcode/image/', views.qrcode_image, name='qrcode_image'),
+    path('qrcode/batch/', views.qrcode_batch, name='qrcode_batch'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<uuid:job_id>/image/', views.job_image, name='job_image'),
     path('dictionary/', views.DictionaryView.as_view(), name='dictionary' ),
+    path('dictionary/browse/', views.AlphabetBrowseView.as_view(), name='dictionary_browse'),
+    path('dictionary/browse/<str:letter>/', views.AlphabetBrowseView.as_view(), name='dictionary_browse_letter'),
+    path('api/dictionary/', views.DictionaryAPIView.as_view(), name='dictionary_api'),
+    path('api/dictionary/autocomplete/', views.DictionaryAutocompleteView.as_view(), name='dictionary_autocomplete'),
+    path('api/dictionary/browse/', views.AlphabetBrowseAPIView.as_view(), name='dictionary_browse_api'),
+    path('api/dictionary/browse/<str:letter>/', views.AlphabetBrowseAPIView.as_view(), name='dictionary_browse_letter_api'),
     path('terms/', views.terms, name='terms'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
     
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + media_urlpatterns()
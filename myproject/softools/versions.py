@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Any, Optional
+
+from django.core.cache import caches
+
+
+class SharedVersion:
+    """A version stamp for cached entries, kept in a Django cache when one is named.
+
+    Entries are stamped with the version they were built at and a bump retires
+    them all. With an alias the version lives in that cache, so a bump in one
+    process is seen by every process; without one it is process-local.
+    Versions are nanosecond timestamps of the last bump (0 until one happens),
+    which doubles as a change marker.
+    """
+
+    def __init__(self, key: str, alias: Optional[str] = None):
+        self.key = key
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._local = 0
+
+    @property
+    def shared(self) -> Any:
+        return caches[self.alias] if self.alias else None
+
+    def get(self) -> int:
+        if self.shared is None:
+            return self._local
+        version = self.shared.get(self.key)
+        if version is None:
+            # Seed from the clock so a lost version never revives old entries.
+            self.shared.add(self.key, time.time_ns(), None)
+            version = self.shared.get(self.key, 0)
+        return version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._local = max(time.time_ns(), self._local + 1)
+            version = self._local
+        if self.shared is not None:
+            self.shared.set(self.key, version, None)
+        return version
@@ -1,19 +1,36 @@
-from typing import Any, Dict, Optional
-from django.http import HttpResponse, HttpRequest
-from django.shortcuts import render, redirect
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+from urllib.parse import urlencode
+from django.http import FileResponse, Http404, HttpResponse, HttpRequest, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.response import TemplateResponse
 from django.contrib import auth, messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.exceptions import ValidationError
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, FormView, TemplateView
+from django.core.files.storage import default_storage
+from django.urls import reverse, reverse_lazy
+from django.views.generic import CreateView, FormView, TemplateView, View
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from sympy import sympify
-from .models import Service, User, Word
+from .models import Alphabet, Job, Service, User
 from .forms import CustomUserCreationForm, CustomUserLoginForm
-from scripts import qrcode_generator
-import random
-from django.db.models import Q
-from difflib import get_close_matches
+from scripts import qrcode_generator, qr_batch, qr_plan, qr_scan
+from scripts.qr_cache import render_cache
+from . import images, jobs
+from .browse import PAGE_SIZE, letter_index, words_page
+from .catalogue import service_catalogue
+from .pagecache import page_cache
+from .dictionary import search_cache, search_word
+from .fuzzy import prefix_index
+from .uploads import MaxSizeUploadHandler
+
+QR_IMAGE_MAX_AGE = 60 * 60 * 24 * 365
 
 class RegisterView(CreateView):
     """Handle user registration."""
@@ -43,13 +60,15 @@ class LoginView(FormView):
             return redirect('home')
         return super().get(request, *args, **kwargs)
 
+@method_decorator(page_cache.page(version=service_catalogue.version), name='dispatch')
 class HomeView(TemplateView):
     """Display home page with services."""
     template_name = 'home.html'
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context['services'] = Service.objects.all()
+        context['services'] = service_catalogue.services()
+        context['services_grid'] = service_catalogue.grid(self.request.user.is_authenticated)
         return context
 
 
@@ -57,87 +76,362 @@ class DictionaryView(TemplateView):
     """Handle dictionary search functionality."""
     template_name = 'dictionary.html'
 
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        query = request.GET.get('query', '').strip().lower()
+        context = self._search_word(query) if query else {}
+        return self.render_to_response(context)
+
     def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         query = request.POST.get('query', '').strip().lower()
         context = self._search_word(query) if query else {}
         return self.render_to_response(context)
 
     def _search_word(self, query: str) -> Dict[str, Any]:
+        return search_word(query)
+
+
+def _dictionary_validator(request: HttpRequest) -> Any:
+    # condition() asks for the ETag and Last-Modified separately; look the validator up once.
+    if not hasattr(request, '_dictionary_validator'):
+        request._dictionary_validator = search_cache.validator()
+    return request._dictionary_validator
+
+
+def _dictionary_last_modified(request: HttpRequest, *args: Any, **kwargs: Any):
+    return _dictionary_validator(request)[0]
+
+
+def _dictionary_etag(request: HttpRequest, *args: Any, **kwargs: Any) -> str:
+    last_modified, words = _dictionary_validator(request)
+    key = f'{request.path}?{request.GET.urlencode()}|{last_modified.isoformat() if last_modified else ""}|{words}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+class DictionaryCacheMixin:
+    """Conditional GET plus Cache-Control derived from the latest Word change."""
+
+    @method_decorator(condition(etag_func=_dictionary_etag, last_modified_func=_dictionary_last_modified))
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        response = super().dispatch(request, *args, **kwargs)
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'DICTIONARY_API_MAX_AGE', 300))
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+class DictionaryAPIView(DictionaryCacheMixin, View):
+    """JSON dictionary lookup: GET /api/dictionary/?q=word"""
+    http_method_names = ['get', 'head']
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        query = request.GET.get('q', '').strip().lower()
+        if not query:
+            return JsonResponse({'error': 'Missing "q" parameter'}, status=400)
+        result = search_word(query)
+        return JsonResponse({
+            'query': query,
+            'results': result.get('word', []),
+            'suggestion': result.get('suggestion', False),
+            'partial_match': result.get('partial_match', False),
+            'error': result.get('error'),
+        })
+
+
+class DictionaryAutocompleteView(DictionaryCacheMixin, View):
+    """Prefix autocomplete: GET /api/dictionary/autocomplete/?q=pre&limit=10"""
+    http_method_names = ['get', 'head']
+    max_limit = 50
+
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        query = request.GET.get('q', '').strip()
         try:
-            exact_matches = Word.objects.filter(word__iexact=query)
-            if exact_matches.exists():
-                return {'word': self._format_word_results(exact_matches)}
-
-            all_words = list(Word.objects.values_list('word', flat=True))
-            similar_words = get_close_matches(query, all_words, n=3, cutoff=0.6)
-            if similar_words:
-                similar_matches = Word.objects.filter(word__in=similar_words)
-                return {
-                    'word': self._format_word_results(similar_matches),
-                    'suggestion': True
-                }
-
-            partial_matches = Word.objects.filter(
-                Q(word__icontains=query) | Q(description__icontains=query)
-            )[:5]
-            if partial_matches.exists():
-                return {
-                    'word': self._format_word_results(partial_matches),
-                    'partial_match': True
-                }
-
-            return {'error': f'No matches found for "{query}"'}
+            limit = min(max(int(request.GET.get('limit', 10)), 1), self.max_limit)
+        except ValueError:
+            return JsonResponse({'error': '"limit" must be an integer'}, status=400)
+        # Completions built from the same validator as the ETag, so a new ETag never carries old words.
+        results = prefix_index.complete(query, limit, version=_dictionary_validator(request))
+        return JsonResponse({'query': query, 'results': results})
 
-        except Exception as e:
-            return {'error': f'An error occurred: {str(e)}'}
+def _alphabet_or_404(letter: str) -> Alphabet:
+    # Both cases of a letter may exist; iexact with get() would raise MultipleObjectsReturned.
+    alphabet = Alphabet.objects.filter(character__iexact=letter).order_by('pk').first()
+    if alphabet is None:
+        raise Http404('No such letter')
+    return alphabet
+
+
+def _page_size(request: HttpRequest) -> int:
+    try:
+        return int(request.GET.get('size', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+
+
+class AlphabetBrowseView(TemplateView):
+    """Browse dictionary words letter by letter."""
+    template_name = 'browse.html'
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['letters'] = letter_index()
+        if 'letter' in kwargs:
+            alphabet = _alphabet_or_404(kwargs['letter'])
+            context['page'] = words_page(alphabet, self.request.GET.get('after'), _page_size(self.request))
+        return context
+
+
+class AlphabetBrowseAPIView(View):
+    """JSON letter index and keyset-paginated word listings."""
+    http_method_names = ['get', 'head']
 
-    def _format_word_results(self, words: Any) -> list:
-        return [{
-            'word': word.word,
-            'type': word.type,
-            'description': word.description
-        } for word in words]
+    def get(self, request: HttpRequest, letter: Optional[str] = None, *args: Any, **kwargs: Any) -> JsonResponse:
+        if letter is None:
+            return JsonResponse({'letters': letter_index()})
+        alphabet = _alphabet_or_404(letter)
+        return JsonResponse(words_page(alphabet, request.GET.get('after'), _page_size(request)))
 
+
+@staff_member_required
+def cache_stats(request: HttpRequest) -> JsonResponse:
+    """Per-process hit/miss counters of the dictionary, catalogue, page, QR render and QR plan caches."""
+    return JsonResponse({
+        'dictionary': search_cache.stats(),
+        'catalogue': service_catalogue.stats(),
+        'pages': page_cache.stats(),
+        'qr_render': render_cache.stats(),
+        'qr_plan': qr_plan.plan_for_shape.cache_info()._asdict(),
+    })
+
+
+@page_cache.page(per_user=False)
 def about(request: HttpRequest) -> HttpResponse:
-    return render(request, 'about.html')
+    return TemplateResponse(request, 'about.html', {})
 
+@page_cache.page(per_user=False)
 def contact(request: HttpRequest) -> HttpResponse:
-    return render(request, 'contact.html')
+    return TemplateResponse(request, 'contact.html', {})
+
+def _qr_params(params: Any) -> Dict[str, Any]:
+    return {
+        'data': params.get('data', ''),
+        'fill_color': params.get('fill_color') or 'black',
+        'back_color': params.get('back_color') or 'white',
+        'image_format': params.get('format', 'png'),
+        'box_size': int(params.get('size', 10)),
+        'border': int(params.get('border', 4)),
+    }
+
+
+def _qr_query(params: Dict[str, Any]) -> str:
+    return urlencode({
+        'data': params['data'], 'fill_color': params['fill_color'], 'back_color': params['back_color'],
+        'format': params['image_format'], 'size': params['box_size'], 'border': params['border'],
+        # Responses are immutable, so a new renderer needs new URLs as well as new ETags.
+        'v': qrcode_generator.QR_RENDER_VERSION,
+    })
+
+
+def _qr_image_etag(request: HttpRequest, *args: Any, **kwargs: Any) -> Optional[str]:
+    try:
+        return qrcode_generator.qr_etag(**_qr_params(request.GET))
+    except ValueError:
+        return None
+
+
+@login_required(login_url='login')
+@require_GET
+@condition(etag_func=_qr_image_etag)
+def qrcode_image(request: HttpRequest) -> HttpResponse:
+    """Raw PNG/SVG/WebP bytes for a QR code; the URL fully determines the image."""
+    try:
+        params = _qr_params(request.GET)
+        image = qrcode_generator.render_qr_code(**params)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    response = HttpResponse(image, content_type=qrcode_generator.IMAGE_FORMATS[params['image_format']])
+    plan = qr_plan.plan_qr(params['data'])
+    response['X-QR-Version'] = plan.version
+    response['X-QR-Error-Correction'] = plan.error_correction
+    response['X-QR-Mode'] = plan.mode
+    extension = qrcode_generator.FILE_EXTENSIONS[params['image_format']]
+    response['Content-Disposition'] = f'inline; filename="qrcode.{extension}"'
+    # Behind a login and the URL holds the payload (Wi-Fi keys, vCards): browsers only, no shared caches.
+    patch_cache_control(response, private=True, max_age=QR_IMAGE_MAX_AGE, immutable=True)
+    return response
+
+
+@login_required(login_url='login')
+@require_POST
+def qrcode_batch(request: HttpRequest) -> HttpResponse:
+    """Render a JSON list of payloads into one streamed ZIP or multi-page PDF."""
+    try:
+        body = json.loads(request.body)
+        items = body['items']
+        output = body.get('output', 'zip')
+        params = _qr_params({**body, 'data': 'x'})
+        del params['data']
+        if not isinstance(items, list) or not items:
+            raise ValueError('"items" must be a non-empty list')
+        max_items = getattr(settings, 'QR_BATCH_MAX_ITEMS', 5000)
+        if len(items) > max_items:
+            raise ValueError(f'At most {max_items} items per batch')
+        stream = qr_batch.batch_stream(items, params, output)
+    except (ValueError, KeyError, TypeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    content_type = 'application/zip' if output == 'zip' else 'application/pdf'
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="qrcodes.{output}"'
+    return response
+
+
+def _payload_types() -> List[Dict[str, str]]:
+    types = []
+    for kind in qrcode_generator.data_encode:
+        encoder = qrcode_generator.data_encode.encoder(kind)
+        example = json.dumps(encoder.example) if encoder.structured else encoder.example
+        types.append({'name': kind, 'example': example})
+    return types
+
+
+def _scan_options() -> Dict[str, Any]:
+    options = getattr(settings, 'QR_SCAN', {})
+    return {
+        'max_bytes': options.get('MAX_BYTES', 5 * 1024 * 1024),
+        'max_pixels': options.get('MAX_PIXELS', 24_000_000),
+        'max_frames': options.get('MAX_FRAMES', 20),
+        'timeout': options.get('TIMEOUT', 15),
+        'workers': options.get('WORKERS'),
+    }
+
+
+def _scan_upload(request: HttpRequest, options: Dict[str, Any]) -> Dict[str, Any]:
+    if 'qrscan' in getattr(request, 'oversized_files', ()):
+        return {'file_scan_data': f"Error scanning QR code: files are limited to {options['max_bytes']} bytes"}
+    if request.POST.get('async'):
+        limits = {key: options[key] for key in ('timeout', 'workers', 'max_pixels', 'max_frames')}
+        job = jobs.submit('qr_scan', {'limits': limits}, request.user, upload=request.FILES['qrscan'])
+        return {'job_id': str(job.pk)}
+    try:
+        scan_results = qr_scan.scan_pool.scan(
+            request.FILES['qrscan'], timeout=options['timeout'], workers=options['workers'],
+            max_pixels=options['max_pixels'], max_frames=options['max_frames'],
+        )
+    except ValueError as e:
+        return {'file_scan_data': f"Error scanning QR code: {e}"}
+    return {
+        'file_scan_data': None if scan_results else "No QR code found in image",
+        'scan_results': scan_results,
+    }
+
+
+def _job_context(request: HttpRequest, job_id: str) -> Dict[str, Any]:
+    """Template context for a background QR job: its status, or its result once done."""
+    job = get_object_or_404(Job, pk=job_id, user=request.user)
+    context: Dict[str, Any] = {'job': jobs.job_state(job), 'job_url': reverse('job_status', args=[job.pk])}
+    if job.status == Job.FAILED:
+        context['file_scan_data'] = f"Error: {job.error}"
+    elif job.status == Job.DONE and job.kind == 'qr_generate':
+        context['qr_image'] = job.result['image']
+        context['file_name'] = job.result['file_name']
+        context['file_extension'] = job.result['file_extension']
+    elif job.status == Job.DONE and job.kind == 'qr_scan':
+        context['scan_results'] = job.result['codes']
+        context['file_scan_data'] = None if job.result['codes'] else "No QR code found in image"
+    return context
+
+
+@login_required(login_url='login')
+@require_GET
+def job_status(request: HttpRequest, job_id: Any) -> HttpResponse:
+    """Poll a background job; Retry-After tells clients when to ask again."""
+    job = get_object_or_404(Job, pk=job_id, user=request.user)
+    response = JsonResponse(jobs.job_state(job))
+    patch_cache_control(response, no_store=True)
+    if not job.is_finished:
+        response['Retry-After'] = 1
+    return response
+
 
 @login_required(login_url='login')
+@require_GET
+def job_image(request: HttpRequest, job_id: Any) -> HttpResponse:
+    """The image a finished qr_generate job rendered, read from storage."""
+    job = get_object_or_404(Job, pk=job_id, user=request.user, kind='qr_generate', status=Job.DONE)
+    try:
+        image = default_storage.open(job.result['file'])
+    except (KeyError, OSError):
+        raise Http404('Image not found') from None
+    response = FileResponse(image, content_type=qrcode_generator.IMAGE_FORMATS[job.payload['params']['image_format']])
+    response['Content-Disposition'] = f"inline; filename=\"{job.result['file_name']}.{job.result['file_extension']}\""
+    patch_cache_control(response, private=True, max_age=QR_IMAGE_MAX_AGE, immutable=True)
+    return response
+
+
+@login_required(login_url='login')
+@csrf_exempt
 def qrcode_app(request: HttpRequest) -> HttpResponse:
+    # Upload handlers must be in place before anything reads request.POST, CSRF
+    # checking included, so the check runs in _qrcode_app instead.
+    if request.method == 'POST':
+        options = _scan_options()
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        # The form's other fields are small; anything much larger is an oversized file.
+        if content_length > options['max_bytes'] + 64 * 1024:
+            request.session['qr_data'] = {
+                'file_scan_data': f"Error scanning QR code: files are limited to {options['max_bytes']} bytes",
+            }
+            return redirect('qrcode')
+        request.upload_handlers.insert(0, MaxSizeUploadHandler(request, options['max_bytes']))
+    return _qrcode_app(request)
+
+
+@csrf_protect
+def _qrcode_app(request: HttpRequest) -> HttpResponse:
     try:
         if request.method == 'POST':
             data = request.POST.get('data')
-            fill_color = request.POST.get('fill_color')
-            back_color = request.POST.get('back_color')
             
             if data:  
-                image_data = qrcode_generator.generate_qr_code(data, fill_color, back_color)
-                file_name = f'qrcode_{random.random()}'
-                request.session['qr_data'] = {
-                    'qr_image': image_data,
-                    'file_name': file_name
-                }
+                params = _qr_params(request.POST)
+                kind = request.POST.get('type') or 'text'
+                params['data'] = qrcode_generator.data_encode.encode(
+                    kind, qrcode_generator.data_encode.parse(kind, data))
+                qrcode_generator.validate_qr_params(**params)
+                if request.POST.get('async'):
+                    job = jobs.submit('qr_generate', {'params': params}, request.user)
+                    return redirect(f"{reverse('qrcode')}?job={job.pk}")
+                return redirect(f"{reverse('qrcode')}?{_qr_query(params)}")
             
-            if request.FILES.get('qrscan'):
-                uploaded_file = request.FILES['qrscan']
-                file_scan_data = qrcode_generator.scan_from_file(file_obj=uploaded_file)
-                request.session['qr_data'] = {
-                    'file_scan_data': file_scan_data
-                }
+            if request.FILES.get('qrscan') or getattr(request, 'oversized_files', None):
+                scan = _scan_upload(request, _scan_options())
+                if 'job_id' in scan:
+                    return redirect(f"{reverse('qrcode')}?job={scan['job_id']}")
+                request.session['qr_data'] = scan
             
             return redirect('qrcode')
 
         else:
-            context = {}
+            context = {'payload_types': _payload_types()}
             if 'qr_data' in request.session:
-                context = request.session.pop('qr_data')
+                context.update(request.session.pop('qr_data'))
+            if request.GET.get('job'):
+                context.update(_job_context(request, request.GET['job']))
+            if request.GET.get('data'):
+                params = _qr_params(request.GET)
+                qrcode_generator.validate_qr_params(**params)
+                context['qr_image'] = f"{reverse('qrcode_image')}?{_qr_query(params)}"
+                context['file_name'] = f"qrcode_{qrcode_generator.qr_etag(**params)[:12]}"
+                context['file_extension'] = qrcode_generator.FILE_EXTENSIONS[params['image_format']]
+                context['qr_params'] = params
+                context['qr_plan'] = qr_plan.plan_qr(params['data'])
             return render(request, 'qrcode.html', context)
             
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
-        return render(request, 'qrcode.html')
+        return render(request, 'qrcode.html', {'payload_types': _payload_types()})
 
 def logout(request: HttpRequest) -> HttpResponse:
     auth.logout(request)
@@ -187,11 +481,29 @@ def profile(request: HttpRequest) -> HttpResponse:
         user.age = updates['new_age']
             
         if 'pic' in request.FILES:
-            user.pic = updates['picture']
+            # Only the header is checked here; the worker decodes, rotates, downscales and
+            # re-encodes the picture, then swaps it in for the placeholder.
+            options = images.profile_picture_settings()
+            try:
+                images.check_upload(updates['picture'], options['max_bytes'], options['max_pixels'])
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect('profile')
+            previous = user.pic.name or ''
+            if previous == images.PLACEHOLDER_NAME:
+                # An earlier upload is still queued; keep the picture it was going to replace.
+                pending = Job.objects.filter(kind='profile_picture', user=user).order_by('-created_at').first()
+                previous = pending.payload.get('previous', '') if pending else ''
+            user.pic = images.placeholder(user.pic.storage)
             
         try:    
             user.save()
-            messages.success(request, 'Profile updated successfully!')
+            if 'pic' in request.FILES:
+                jobs.submit('profile_picture', {'user_id': user.pk, 'placeholder': user.pic.name,
+                                                'previous': previous}, user, upload=updates['picture'])
+                messages.success(request, 'Profile updated! Your new picture will appear in a moment.')
+            else:
+                messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
         except Exception as e:
             messages.error(request, f'An error occurred: {str(e)}')
@@ -217,7 +529,8 @@ def delete_account(request: HttpRequest) -> HttpResponse:
 def settings_view(request: HttpRequest) -> HttpResponse:
     return render(request, 'settings.html', {'user': request.user})
 
+@page_cache.page(per_user=False)
 def terms(request: HttpRequest) -> HttpResponse:
-    return render(request, 'terms.html')
+    return TemplateResponse(request, 'terms.html', {})
 
 